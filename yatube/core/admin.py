@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import StoredFile, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_after',
+                    'created', 'finished')
+    list_filter = ('status',)
+    search_fields = ('name',)
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'refcount', 'created')
+    search_fields = ('name',)
@@ -0,0 +1,31 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedRender:
+    """Примесь к шаблону бэкенда: время рендера попадает в метрики."""
+
+    def render(self, context=None, request=None):
+        with metrics.timer('template'):
+            return super().render(context, request)
+
+
+class TimedTemplate(TimedRender, Template):
+    pass
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates с замером рендера.
+
+    Оборачиваются только шаблоны, которые отдаёт бэкенд, поэтому
+    ``{% include %}`` и ``{% extends %}`` внутри не считаются дважды.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template,
+                             self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
@@ -0,0 +1,57 @@
+import fcntl
+import os
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+from . import metrics
+
+LOCK_TIMEOUT = 30
+ADD_LOCK = 'add.lock'
+
+
+class LockingFileBasedCache(FileBasedCache):
+    """Файловый кэш, общий для всех процессов на машине, с атомарным
+    ``add``: проверка и запись идут под ``flock`` на файле в каталоге
+    кэша, поэтому годится для ``single_flight`` вместо Redis."""
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        with open(os.path.join(self._dir, ADD_LOCK), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            return super().add(key, value, timeout, version)
+
+
+def single_flight(key, compute, version=None, timeout=None):
+    """Возвращает закэшированное значение, пересчитывая его в одном
+    процессе.
+
+    Значение устаревает, когда меняется ``version`` или проходит
+    ``timeout`` секунд. Пересчёт выполняет тот, кто первым захватил
+    блокировку через ``cache.add``; остальные в это время получают
+    устаревшее значение, если оно есть. Поэтому кэш должен выполнять
+    ``add`` атомарно: LocMemCache, Redis и ``LockingFileBasedCache``
+подходят, обычный FileBasedCache — нет.
+    """
+    cached = cache.get(key)
+    if cached is not None:
+        cached_version, expires, value = cached
+        if cached_version == version and (
+                expires is None or expires > time.time()):
+            metrics.cache_lookup(hit=True)
+            return value
+    metrics.cache_lookup(hit=False)
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, True, LOCK_TIMEOUT):
+        if cached is not None:
+            return value
+        return compute()
+    try:
+        value = compute()
+        expires = None if timeout is None else time.time() + timeout
+        cache.set(key, (version, expires, value), None)
+    finally:
+        cache.delete(lock_key)
+    return value
@@ -0,0 +1,69 @@
+"""Настройка и обслуживание SQLite.
+
+``configure`` вызывается на каждое новое соединение и выставляет
+``settings.SQLITE_PRAGMAS``: WAL, чтобы писатели не блокировали
+читателей, ``synchronous=NORMAL``, mmap, кэш страниц и ожидание
+блокировки. ``maintain`` — периодическое обслуживание для
+``manage.py dbmaintain``; каждый его шаг короткий, поэтому запросы
+сайта не ждут его дольше долей секунды.
+"""
+import time
+
+from django.conf import settings
+
+# ANALYZE читает не больше стольких строк каждого индекса.
+ANALYSIS_LIMIT = 1000
+
+
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def maintain(connection, pages=1000, pause=0.05):
+    """Обновляет статистику планировщика, возвращает свободные страницы
+    файлу и переносит WAL в базу, не блокируя её надолго.
+
+    Свободные страницы освобождаются пачками по ``pages`` с паузой
+    ``pause`` секунд между ними; это работает, только если в базе
+    ``auto_vacuum = INCREMENTAL``. Возвращает словарь с тем, что
+    сделано.
+    """
+    report = {}
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+        cursor.execute('ANALYZE')
+        cursor.execute('PRAGMA optimize')
+        report['incremental'] = pragma(cursor, 'auto_vacuum') == 2
+        free = initial = pragma(cursor, 'freelist_count')
+        while report['incremental'] and free:
+            cursor.execute(f'PRAGMA incremental_vacuum({min(free, pages)})')
+            cursor.fetchall()
+            left = pragma(cursor, 'freelist_count')
+            if left >= free:
+                break
+            free = left
+            if free:
+                time.sleep(pause)
+        report['freed_pages'] = initial - free
+        report['free_pages'] = free
+        if pragma(cursor, 'journal_mode') == 'wal':
+            cursor.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            report['checkpoint'] = list(cursor.fetchone())
+    return report
+
+
+def enable_incremental_vacuum(connection):
+    """Разовый полный VACUUM с переводом базы в ``auto_vacuum =
+    INCREMENTAL``: блокирует базу на всё время работы."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
@@ -0,0 +1,89 @@
+"""Отдача файлов с диска: валидаторы, диапазоны Range и передача прокси.
+
+Тело отдаёт ``FileResponse``: под gunicorn и другими серверами с
+``wsgi.file_wrapper`` файл уходит через ``sendfile`` без копирования в
+Python. Для диапазона ``RangeFile`` сдвигает позицию и ограничивает
+длину, но оставляет ``fileno()``, так что ``sendfile`` работает и для
+кусков.
+"""
+from django.utils.http import parse_http_date_safe
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+class RangeFile:
+    """Кусок файла ``length`` байт начиная со ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """Диапазон ``(start, end)`` включительно из заголовка Range.
+
+    None — отдать файл целиком: заголовка нет, он не про байты, в нём
+    несколько диапазонов или он с ошибкой; всё это RFC 7233 разрешает
+    игнорировать. Диапазон за концом файла — ``RangeNotSatisfiable``.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec:
+        return None
+    first, dash, last = spec.partition('-')
+    if not dash:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0 or last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def range_applies(request, etag, last_modified):
+    """If-Range: диапазон действует, только если файл не менялся."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def open_range(path, byte_range):
+    file = open(path, 'rb')
+    if byte_range is None:
+        return file
+    start, end = byte_range
+    return RangeFile(file, start, end - start + 1)
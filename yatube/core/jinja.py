@@ -0,0 +1,128 @@
+"""Окружение Jinja2 для шаблонов из каталога ``jinja2/``.
+
+Шаблоны Jinja2 — копии горячих шаблонов лент; вместо тегов Django в
+них глобальные функции ``url``/``static``, фильтры Django подключены
+под теми же именами, а ``{% cache %}`` и ``{% singleflight %}``
+заменены блоками ``{% call cache_fragment(...) %}`` и
+``{% call singleflight(...) %}``.
+
+``stream()`` отдаёт шаблон потоком: ``{{ flush }}`` в шаблоне отмечает
+место, где накопленный HTML уходит клиенту. При обычном рендере
+``flush`` пустой.
+"""
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import StreamingHttpResponse
+from django.template import defaultfilters, engines
+from django.template.backends.jinja2 import Jinja2, Template
+from django.template.backends.utils import csrf_input_lazy, csrf_token_lazy
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment, pass_context
+from markupsafe import Markup
+
+from . import metrics
+from .backends import TimedRender
+from .cache import single_flight
+from .templatetags.assets import script_tag, stylesheet_tag
+from .templatetags.pictures import picture_tag
+from .templatetags.user_filters import addclass
+
+FLUSH = '<!--flush-->'
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def cache_fragment(name, *vary_on, timeout=None, caller):
+    """Как ``{% cache timeout name vary_on %}``."""
+    key = make_template_fragment_key(name, vary_on)
+    value = cache.get(key)
+    metrics.cache_lookup(hit=value is not None)
+    if value is None:
+        value = caller()
+        cache.set(key, str(value), timeout)
+    return Markup(value)
+
+
+def singleflight(name, *vary_on, timeout=None, version=None, caller):
+    """Как ``{% singleflight timeout name vary_on version=version %}``."""
+    return Markup(single_flight(make_template_fragment_key(name, vary_on),
+                                lambda: str(caller()), version=version,
+                                timeout=timeout))
+
+
+@pass_context
+def stylesheet(context, path):
+    return Markup(stylesheet_tag(context.get('request'), path))
+
+
+@pass_context
+def script(context, path):
+    return Markup(script_tag(context.get('request'), path))
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': staticfiles_storage.url,
+        'cache_fragment': cache_fragment,
+        'singleflight': singleflight,
+        'stylesheet': stylesheet,
+        'script': script,
+        'picture': picture_tag,
+        'flush': Markup(''),
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'date': date,
+        'linebreaksbr': defaultfilters.linebreaksbr,
+    })
+    return env
+
+
+class TimedTemplate(TimedRender, Template):
+    def generate(self, context=None, request=None):
+        """Куски HTML между отметками ``{{ flush }}``."""
+        context = dict(context or {}, flush=Markup(FLUSH))
+        if request is not None:
+            context['request'] = request
+            context['csrf_input'] = csrf_input_lazy(request)
+            context['csrf_token'] = csrf_token_lazy(request)
+            for processor in self.backend.template_context_processors:
+                context.update(processor(request))
+        buffer = []
+        for piece in self.template.generate(context):
+            if FLUSH in piece:
+                *flushed, rest = piece.split(FLUSH)
+                buffer.extend(flushed)
+                yield ''.join(buffer)
+                buffer = [rest]
+            else:
+                buffer.append(piece)
+        yield ''.join(buffer)
+
+
+class TimedJinja2(Jinja2):
+    """Jinja2 с замером рендера, как ``TimedDjangoTemplates``."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template,
+                             self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
+
+
+def stream(request, template_name, context=None):
+    """Потоковый ответ из шаблона Jinja2."""
+    template = engines['jinja2'].get_template(template_name)
+    return StreamingHttpResponse(template.generate(context, request))
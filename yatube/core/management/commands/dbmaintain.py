@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import db
+
+
+class Command(BaseCommand):
+    help = ('Обслуживает базу SQLite: ANALYZE, PRAGMA optimize, '
+            'постепенный VACUUM и checkpoint WAL. Запускается по cron '
+            'или сам раз в --every минут.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--pages', type=int, default=1000,
+                            help='Страниц за один шаг VACUUM.')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Пауза между шагами VACUUM, секунды.')
+        parser.add_argument('--every', type=float,
+                            help='Повторять раз в столько минут.')
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Один раз перевести базу в auto_vacuum=INCREMENTAL '
+                 'полным VACUUM; база блокируется на всё время работы.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('dbmaintain работает только с SQLite')
+        if options['enable_incremental_vacuum']:
+            db.enable_incremental_vacuum(connection)
+        while True:
+            report = db.maintain(connection, pages=options['pages'],
+                                 pause=options['pause'])
+            self.write_report(report)
+            if not options['every']:
+                return
+            connection.close()
+            time.sleep(options['every'] * 60)
+
+    def write_report(self, report):
+        if not report['incremental']:
+            self.stderr.write(
+                'auto_vacuum не INCREMENTAL, свободные страницы не '
+                'возвращаются: запустите с --enable-incremental-vacuum')
+        message = (f'Освобождено страниц: {report["freed_pages"]}, '
+                   f'свободно: {report["free_pages"]}')
+        if 'checkpoint' in report:
+            busy, log, checkpointed = report['checkpoint']
+            message += f', WAL: {checkpointed} из {log} страниц в базе'
+        self.stdout.write(self.style.SUCCESS(message))
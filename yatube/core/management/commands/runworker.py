@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from core import tasks
+
+# Как часто простаивающий обработчик удаляет старые выполненные задачи.
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчик фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--visibility-timeout', type=int,
+                            default=tasks.VISIBILITY_TIMEOUT)
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        if options['processes'] == 1:
+            self.run_process(options)
+            return
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.run_process, args=(options,))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    def run_process(self, options):
+        stop = threading.Event()
+        handlers = {
+            signum: signal.signal(signum, lambda *args: stop.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            if options['threads'] == 1:
+                self.run_thread(options, stop)
+                return
+            threads = [
+                threading.Thread(target=self.run_thread, args=(options, stop))
+                for _ in range(options['threads'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run_thread(self, options, stop):
+        purged = None
+        try:
+            while not stop.is_set():
+                try:
+                    if tasks.run_next(options['visibility_timeout']):
+                        continue
+                    if (purged is None
+                            or time.monotonic() - purged > PURGE_INTERVAL):
+                        tasks.purge()
+                        purged = time.monotonic()
+                except OperationalError:
+                    stop.wait(options['poll_interval'])
+                    continue
+                if options['burst']:
+                    return
+                stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
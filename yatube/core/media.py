@@ -0,0 +1,78 @@
+"""Счётчики ссылок на файлы в хранилище по содержимому.
+
+Один файл может быть картинкой многих постов, поэтому удаляется он,
+только когда счётчик опускается до нуля. Считаются только имена-хэши:
+файлы, загруженные до хранилища по содержимому, в ``StoredFile`` не
+попадают и отсюда никогда не удаляются.
+
+Первую ссылку на загруженный файл берёт само хранилище в ``save``,
+остальные — код, который присваивает готовое имя.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import StoredFile
+from .storage import is_content_name
+
+
+def retain(name):
+    if not is_content_name(name):
+        return
+    if StoredFile.objects.filter(name=name).update(
+            refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        # Ту же запись только что создал параллельный запрос.
+        StoredFile.objects.filter(name=name).update(
+            refcount=F('refcount') + 1)
+
+
+def release(name, storage):
+    """Снимает ссылку; последний пользователь файла удаляет его с диска
+    после коммита."""
+    if not name:
+        return
+    StoredFile.objects.filter(name=name).update(
+        refcount=Greatest(F('refcount') - 1, 0))
+    deleted, _ = StoredFile.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_unused(name, storage))
+
+
+def delete_unused(name, storage):
+    """Удаляет файл, если на него снова не сослались.
+
+    На время удаления имя занимает запись с нулём ссылок: ``retain`` из
+    параллельной загрузки того же содержимого ждёт её коммита и уже
+    потом проверяет, есть ли файл на диске, а если ссылка появилась
+    раньше, запись не создаётся и файл остаётся.
+    """
+    try:
+        with transaction.atomic():
+            placeholder = StoredFile.objects.create(name=name, refcount=0)
+            storage.delete(name)
+            placeholder.delete()
+    except IntegrityError:
+        pass
+
+
+def set_counts(counts, storage):
+    """Выставляет счётчики по фактическим ссылкам ``{имя: число}``;
+    файлы, на которые больше никто не ссылается, удаляются."""
+    existing = dict(StoredFile.objects.values_list('name', 'refcount'))
+    for name, refcount in counts.items():
+        if name not in existing:
+            StoredFile.objects.create(name=name, refcount=refcount)
+        elif existing[name] != refcount:
+            StoredFile.objects.filter(name=name).update(refcount=refcount)
+    unused = [name for name in existing if name not in counts]
+    for start in range(0, len(unused), 500):
+        StoredFile.objects.filter(name__in=unused[start:start + 500]).delete()
+    for name in unused:
+        transaction.on_commit(
+            lambda name=name: delete_unused(name, storage))
+    return len(unused)
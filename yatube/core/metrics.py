@@ -0,0 +1,239 @@
+"""Метрики запросов: заголовок Server-Timing и гистограммы для Prometheus.
+
+``MetricsMiddleware`` заводит на каждый запрос свой ``RequestMetrics`` в
+thread-local, поэтому SQL (через ``connection.execute_wrapper``),
+рендер шаблонов, обращения к кэшу и нарезка миниатюр записываются
+туда без передачи объектов по коду. В конце запроса всё складывается
+в общий ``registry`` с меткой ``view`` — именем URL; реестр защищён
+блокировкой и общий для всех потоков процесса. У каждого процесса
+свой реестр, Prometheus собирает их по отдельности.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                    10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'request_duration_seconds': ('Время ответа', DURATION_BUCKETS),
+    'db_duration_seconds': ('Время SQL-запросов за запрос',
+                            DURATION_BUCKETS),
+    'db_queries': ('Число SQL-запросов за запрос', QUERY_BUCKETS),
+    'template_duration_seconds': ('Время рендера шаблонов за запрос',
+                                  DURATION_BUCKETS),
+    'thumbnail_duration_seconds': ('Время нарезки миниатюр',
+                                   DURATION_BUCKETS),
+}
+COUNTERS = {
+    'cache_requests_total': 'Обращения к кэшу по результату',
+}
+PREFIX = 'yatube_'
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+
+
+class Registry:
+    """Накопленные гистограммы и счётчики; безопасен между потоками."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = defaultdict(int)
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [
+                    [0] * len(buckets), 0.0, 0]
+            counts = histogram[0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        with self._lock:
+            histograms = {key: (list(counts), total, count)
+                          for key, (counts, total, count)
+                          in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {PREFIX}{name} {description}')
+            lines.append(f'# TYPE {PREFIX}{name} histogram')
+            for (metric, labels), (counts, total, count) in sorted(
+                    histograms.items()):
+                if metric != name:
+                    continue
+                for bound, bucket in zip(buckets, counts):
+                    lines.append(_sample(f'{name}_bucket', labels, bucket,
+                                         le=_number(bound)))
+                lines.append(_sample(f'{name}_bucket', labels, count,
+                                     le='+Inf'))
+                lines.append(_sample(f'{name}_sum', labels, total))
+                lines.append(_sample(f'{name}_count', labels, count))
+        for name, description in COUNTERS.items():
+            lines.append(f'# HELP {PREFIX}{name} {description}')
+            lines.append(f'# TYPE {PREFIX}{name} counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(_sample(name, labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('"', '\\"'))
+
+
+def _sample(name, labels, value, **extra):
+    pairs = list(labels) + list(extra.items())
+    rendered = ','.join(f'{key}="{_escape(label)}"' for key, label in pairs)
+    return f'{PREFIX}{name}{{{rendered}}} {_number(value)}'
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.cache = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total):
+        parts = [f'app;dur={total * 1000:.1f}',
+                 f'db;dur={self.durations["db"] * 1000:.1f};'
+                 f'desc="{self.queries} queries"']
+        for name in ('template', 'thumbnail'):
+            if name in self.durations:
+                parts.append(f'{name};dur={self.durations[name] * 1000:.1f}')
+        if self.cache:
+            parts.append(f'cache;desc="hit={self.cache["hit"]} '
+                         f'miss={self.cache["miss"]}"')
+        return ', '.join(parts)
+
+    def record(self, view, total):
+        labels = {'view': view}
+        registry.observe('request_duration_seconds', labels, total)
+        registry.observe('db_duration_seconds', labels,
+                         self.durations['db'])
+        registry.observe('db_queries', labels, self.queries)
+        if 'template' in self.durations:
+            registry.observe('template_duration_seconds', labels,
+                             self.durations['template'])
+        if 'thumbnail' in self.durations:
+            registry.observe('thumbnail_duration_seconds', labels,
+                             self.durations['thumbnail'])
+        for result, count in self.cache.items():
+            registry.inc('cache_requests_total',
+                         {'view': view, 'result': result}, count)
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время блока к ``name`` текущего запроса.
+
+    Вне запроса (например, в обработчике задач) замер, если для него
+    есть гистограмма, сразу попадает в реестр с пустой меткой view.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics = current()
+        if metrics is not None:
+            metrics.durations[name] += elapsed
+        elif f'{name}_duration_seconds' in HISTOGRAMS:
+            registry.observe(f'{name}_duration_seconds', {'view': ''},
+                             elapsed)
+
+
+def cache_lookup(hit):
+    metrics = current()
+    result = 'hit' if hit else 'miss'
+    if metrics is not None:
+        metrics.cache[result] += 1
+    else:
+        registry.inc('cache_requests_total', {'view': '', 'result': result})
+
+
+def is_allowed(request):
+    """Метрики видны персоналу и по ``Authorization: Bearer
+    <METRICS_TOKEN>``."""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff or (
+        token and constant_time_compare(authorization, f'Bearer {token}')))
+
+
+class MetricsMiddleware:
+    """Замеряет запрос целиком; должен стоять первым в MIDDLEWARE.
+
+    Заголовок Server-Timing получают только те, кому видны метрики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        metrics.record(match.view_name if match else UNRESOLVED, total)
+        if is_allowed(request):
+            response['Server-Timing'] = metrics.server_timing(total)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='finished',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Завершена'),
+        ),
+    ]
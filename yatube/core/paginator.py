@@ -0,0 +1,44 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Примерное число строк нефильтрованной таблицы из статистики
+    планировщика или None, если оценки нет."""
+    if queryset.query.where or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 появляется после ANALYZE.
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table])
+            except DatabaseError:
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return int(str(row[0]).split()[0].split('.')[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который для большой нефильтрованной таблицы берёт
+    число строк из статистики вместо COUNT(*)."""
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        return estimate
@@ -0,0 +1,227 @@
+"""Профилирование отдельных запросов в рабочем окружении.
+
+Запрос профилируется, если он попал в долю ``PROFILE_SAMPLE_RATE``,
+пришёл с подписанным заголовком ``X-Profile`` или его открыл сотрудник
+с ``?profile=1``. Профилировщик ставится через ``sys.setprofile`` только
+в поток этого запроса, поэтому соседние запросы не замедляются.
+
+Для каждого профиля в ``PROFILE_DIR`` пишутся два файла: ``.collapsed``
+со стеками в формате flamegraph.pl/speedscope (вес — собственное время
+в микросекундах) и ``.txt`` со сводкой самых дорогих функций.
+"""
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+TOKEN_SALT = 'core.profiling'
+NAME_RE = re.compile(r'^[\w.-]+\.(collapsed|txt)$')
+
+
+class Profiler:
+    """Трассирующий профилировщик: дерево стеков и итоги по функциям.
+
+    Стек хранится деревом: у каждого узла собственное время и дети по
+    подписи функции, поэтому вызов обходится без копирования пути.
+    """
+
+    def __init__(self):
+        self.root = [0.0, {}]
+        self.functions = {}
+        self._stack = []
+        self._active = Counter()
+        self._labels = {}
+        self._paths = {}
+
+    def __enter__(self):
+        sys.setprofile(self._event)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.setprofile(None)
+        self._stack.clear()
+
+    def _path(self, filename):
+        path = self._paths.get(filename)
+        if path is None:
+            path = filename
+            for prefix in sorted(sys.path, key=len, reverse=True):
+                if prefix and filename.startswith(prefix + os.sep):
+                    path = filename[len(prefix) + 1:]
+                    break
+            self._paths[filename] = path
+        return path
+
+    def _label(self, frame, event, arg):
+        if event == 'c_call':
+            # Связанные встроенные методы каждый раз новые, кэшировать
+            # подпись по ним нельзя.
+            module = getattr(arg, '__module__', None)
+            name = getattr(arg, '__qualname__', type(arg).__name__)
+            return f'{module}.{name}' if module else name
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (
+                f'{code.co_name} ({self._path(code.co_filename)}:'
+                f'{code.co_firstlineno})').replace(';', ',')
+        return label
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if event in ('call', 'c_call'):
+            label = self._label(frame, event, arg)
+            parent = self._stack[-1][0] if self._stack else self.root
+            node = parent[1].get(label)
+            if node is None:
+                node = parent[1][label] = [0.0, {}]
+            self._active[label] += 1
+            self._stack.append([node, label, now, 0.0])
+        elif self._stack:
+            # return, c_return, c_exception
+            node, label, started, children = self._stack.pop()
+            elapsed = now - started
+            node[0] += elapsed - children
+            stats = self.functions.setdefault(label, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed - children
+            self._active[label] -= 1
+            if not self._active[label]:
+                stats[2] += elapsed
+            if self._stack:
+                self._stack[-1][3] += elapsed
+
+    def collapsed(self):
+        """Строки ``кадр;кадр;кадр вес`` для flamegraph.pl."""
+        lines = []
+        pending = [((label,), node)
+                   for label, node in self.root[1].items()]
+        while pending:
+            path, (own, children) = pending.pop()
+            weight = round(own * 1_000_000)
+            if weight:
+                lines.append(f'{";".join(path)} {weight}')
+            pending.extend((path + (label,), node)
+                           for label, node in children.items())
+        return '\n'.join(sorted(lines)) + '\n'
+
+    def summary(self, limit):
+        def table(title, column):
+            rows = sorted(self.functions.items(),
+                          key=lambda item: item[1][column], reverse=True)
+            lines = [title, f'{"вызовов":>9} {"своё, мс":>10} '
+                            f'{"всего, мс":>10}  функция']
+            for label, (calls, own, total) in rows[:limit]:
+                lines.append(f'{calls:>9} {own * 1000:>10.2f} '
+                             f'{total * 1000:>10.2f}  {label}')
+            return lines
+
+        return '\n'.join(table('По собственному времени', 1) + ['']
+                         + table('По времени с вложенными вызовами', 2))
+
+
+def make_token():
+    """Подписанное значение заголовка X-Profile."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(uuid.uuid4().hex)
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    rate = settings.PROFILE_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return True
+    token = request.META.get('HTTP_X_PROFILE')
+    if token:
+        return valid_token(token)
+    return request.GET.get('profile') == '1' and request.user.is_staff
+
+
+def save(request, response, profiler, elapsed):
+    """Пишет оба файла профиля и возвращает их общее имя."""
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name.replace(':', '.') if match else 'unresolved'
+    name = (f'{timezone.now():%Y%m%dT%H%M%S}-{view}-'
+            f'{uuid.uuid4().hex[:8]}')
+    header = (f'{request.method} {request.get_full_path()}\n'
+              f'view: {view}\n'
+              f'status: {response.status_code}\n'
+              f'time: {elapsed * 1000:.1f} мс\n\n')
+    path = os.path.join(directory, name)
+    with open(f'{path}.txt', 'w', encoding='utf-8') as summary:
+        summary.write(header + profiler.summary(settings.PROFILE_TOP) + '\n')
+    with open(f'{path}.collapsed', 'w', encoding='utf-8') as stacks:
+        stacks.write(profiler.collapsed())
+    prune(directory, settings.PROFILE_KEEP)
+    return name
+
+
+def prune(directory, keep):
+    """Оставляет ``keep`` последних профилей."""
+    names = sorted(name[:-len('.txt')] for name in os.listdir(directory)
+                   if name.endswith('.txt'))
+    for name in names[:-keep]:
+        for extension in ('.txt', '.collapsed'):
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def saved_profiles():
+    """Сохранённые профили, новые первыми."""
+    directory = settings.PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in sorted(os.listdir(directory), reverse=True):
+        if not filename.endswith('.txt'):
+            continue
+        name = filename[:-len('.txt')]
+        with open(os.path.join(directory, filename),
+                  encoding='utf-8') as summary:
+            head = [next(summary, '').strip() for _ in range(4)]
+        profiles.append({'name': name, 'request': head[0],
+                         'status': head[2].partition(': ')[2],
+                         'time': head[3].partition(': ')[2]})
+    return profiles
+
+
+def profile_path(filename):
+    """Путь к файлу профиля или None, если имя чужое."""
+    if not NAME_RE.match(filename):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, filename)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilerMiddleware:
+    """Ставится после AuthenticationMiddleware: нужен request.user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        started = time.perf_counter()
+        with Profiler() as profiler:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        response['X-Profile-Id'] = save(request, response, profiler, elapsed)
+        return response
@@ -0,0 +1,147 @@
+"""Хранилище статики: имена с хэшем содержимого и готовые .gz/.br.
+
+``collectstatic`` раскладывает файлы под именами вида
+``bootstrap.min.<md5>.css`` и сразу сжимает текстовые файлы, поэтому
+при отдаче ничего не сжимается на лету, а хэшированные имена можно
+кэшировать навсегда. Brotli используется, если установлен пакет
+``brotli``.
+
+Файлы, которых нет в манифесте (в том числе пока ``collectstatic`` не
+запускали), ``{% static %}`` отдаёт под исходными именами.
+
+Загрузки хранит ``ContentAddressedStorage``: имя файла — SHA-256 его
+содержимого, разложенный по подкаталогам ``ab/cd/``, так что одинаковые
+файлы лежат на диске один раз.
+"""
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html',
+                '.xml', '.ico')
+MIN_SIZE = 256
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CONTENT_NAME_RE = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:\.\w{1,10})?$')
+INCOMING = '.incoming'
+
+
+def compress(content):
+    """Сжатые варианты ``content`` по расширениям; только те, что
+    меньше исходника."""
+    variants = {'.gz': gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content,
+                                          mode=brotli.MODE_TEXT)
+    return {suffix: data for suffix, data in variants.items()
+            if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет в манифесте: страница не должна падать из-за
+            # одной ссылки, отдаём исходное имя без вечного кэша.
+            return name
+
+    @cached_property
+    def hashed_names(self):
+        """Имена с хэшем: их содержимое никогда не меняется."""
+        return frozenset(self.hashed_files.values())
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        self.__dict__.pop('hashed_names', None)
+        # Сжимаются итоговые имена из манифеста: промежуточные копии
+        # CSS с прошлых проходов никому не отдаются.
+        for name, hashed_name in self.hashed_files.items():
+            self.compress(name)
+            self.compress(hashed_name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_SIZE:
+            return
+        for suffix, data in compress(content).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
+
+
+def is_content_name(name):
+    """True для имён, которые выдаёт ``ContentAddressedStorage``."""
+    return bool(CONTENT_NAME_RE.search(name or ''))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы под именами ``<каталог>/ab/cd/<sha256>.<расширение>``.
+
+    Содержимое хэшируется, пока пишется во временный файл рядом с
+    хранилищем; затем файл переносится под итоговое имя или удаляется,
+    если такой уже есть. Каталог из ``upload_to`` сохраняется.
+
+    ``save`` берёт ссылку на файл (``core.media.retain``) до того, как
+    проверить, лежит ли он уже на диске: удаление последней ссылки,
+    идущее в это время, либо успеет убрать файл до проверки, либо
+    увидит новую ссылку и файл не тронет.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменит хэш, а одинаковое содержимое — не
+        # конфликт, а повтор.
+        return name
+
+    def _save(self, name, content):
+        from . import media  # media импортирует отсюда is_content_name
+
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        if not re.fullmatch(r'\.\w{1,10}', extension):
+            extension = ''
+        incoming = self.path(INCOMING)
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(directory, hexdigest[:2], hexdigest[2:4],
+                                  hexdigest + extension)
+            media.retain(name)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+            else:
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
@@ -0,0 +1,118 @@
+import functools
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+VISIBILITY_TIMEOUT = 300
+ACTIVE = (Task.QUEUED, Task.RUNNING)
+
+_registry = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу: ``func.delay(*args)`` ставит её
+    в очередь. Аргументы должны сериализоваться в JSON."""
+    name = f'{func.__module__}.{func.__name__}'
+    _registry[name] = func
+    func.delay = functools.partial(enqueue, name)
+    return func
+
+
+def enqueue(name, *args, max_attempts=3):
+    """Добавляет задачу в очередь в текущей транзакции, поэтому она
+    становится видна обработчику только вместе с её данными."""
+    return Task.objects.create(name=name, args=json.dumps(args),
+                               max_attempts=max_attempts)
+
+
+def expire(now=None):
+    """Помечает упавшими задачи, захват которых истёк, а попытки
+    кончились: обработчик умирал на них каждый раз (OOM, SIGKILL)."""
+    now = now or timezone.now()
+    return Task.objects.filter(
+        status=Task.RUNNING, run_after__lte=now,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Task.FAILED, finished=now,
+             last_error='Visibility timeout expired on the last attempt')
+
+
+def claim(visibility_timeout=VISIBILITY_TIMEOUT):
+    """Захватывает готовую задачу.
+
+    Захват — условный UPDATE, поэтому два обработчика не получат одну
+    задачу. Задача, не завершённая за ``visibility_timeout`` секунд,
+    снова становится доступной, пока у неё остаются попытки.
+    """
+    now = timezone.now()
+    expire(now)
+    ready = Task.objects.filter(status__in=ACTIVE, run_after__lte=now,
+                                attempts__lt=F('max_attempts'))
+    for pk in ready.values_list('pk', flat=True)[:10]:
+        claimed = ready.filter(pk=pk).update(
+            status=Task.RUNNING,
+            run_after=now + timedelta(seconds=visibility_timeout),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    func = _registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.name}')
+        func(*json.loads(job.args))
+    except Exception:
+        logger.exception('Task %s (%s) failed', job.pk, job.name)
+        jobs = Task.objects.filter(pk=job.pk)
+        if job.attempts < job.max_attempts:
+            backoff = timedelta(seconds=2 ** job.attempts)
+            jobs.update(
+                status=Task.QUEUED,
+                run_after=timezone.now() + backoff,
+                last_error=traceback.format_exc(),
+            )
+        else:
+            jobs.update(status=Task.FAILED, finished=timezone.now(),
+                        last_error=traceback.format_exc())
+        return False
+    Task.objects.filter(pk=job.pk).update(status=Task.DONE,
+                                          finished=timezone.now())
+    return True
+
+
+def purge(keep=None):
+    """Удаляет выполненные задачи старше ``keep`` секунд
+    (``settings.TASK_DONE_TTL``); упавшие остаются для разбора."""
+    keep = settings.TASK_DONE_TTL if keep is None else keep
+    return Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(seconds=keep),
+    ).delete()[0]
+
+
+def run_next(visibility_timeout=VISIBILITY_TIMEOUT):
+    """Выполняет одну задачу; возвращает False, если очередь пуста."""
+    job = claim(visibility_timeout)
+    if job is None:
+        return False
+    execute(job)
+    return True
+
+
+@task
+def send_mail(subject, message, recipient_list):
+    mail.send_mail(subject, message, settings.DEFAULT_FROM_EMAIL,
+                   recipient_list)
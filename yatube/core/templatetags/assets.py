@@ -0,0 +1,47 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def first_use(request, url):
+    """True, если ``url`` ещё не выводился в ответе на ``request``."""
+    if request is None:
+        return True
+    seen = request.__dict__.setdefault('_rendered_assets', set())
+    if url in seen:
+        return False
+    seen.add(url)
+    return True
+
+
+def stylesheet_tag(request, path):
+    url = static(path)
+    if not first_use(request, url):
+        return ''
+    return format_html('<link rel="stylesheet" href="{}">', url)
+
+
+def script_tag(request, path):
+    url = static(path)
+    if not first_use(request, url):
+        return ''
+    return format_html('<script src="{}" defer></script>', url)
+
+
+@register.simple_tag(takes_context=True)
+def stylesheet(context, path):
+    """``<link rel="stylesheet">`` на статический файл, один раз за
+    ответ, сколько бы шаблонов его ни подключали.
+
+        {% load assets %}
+        {% stylesheet 'css/bootstrap.min.css' %}
+    """
+    return stylesheet_tag(context.get('request'), path)
+
+
+@register.simple_tag(takes_context=True)
+def script(context, path):
+    """``<script defer>`` на статический файл, один раз за ответ."""
+    return script_tag(context.get('request'), path)
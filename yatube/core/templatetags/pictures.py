@@ -0,0 +1,36 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def picture_tag(rendition, css_class='', alt=''):
+    if not rendition:
+        return ''
+    if isinstance(rendition, str):
+        # Рендиция, нарезанная до появления srcset: просто адрес.
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" loading="lazy">',
+            css_class, rendition, alt)
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((type_, srcset, rendition['sizes'])
+         for type_, srcset in rendition['sources']))
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" alt="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        sources, css_class, rendition['src'], rendition['srcset'],
+        rendition['sizes'], rendition['width'], rendition['height'], alt)
+
+
+@register.simple_tag
+def picture(rendition, css_class='', alt=''):
+    """``<picture>`` с форматами и ширинами рендиции из
+    ``Post.renditions``; ширина и высота заданы, чтобы ленивая загрузка
+    не сдвигала страницу.
+
+        {% load pictures %}
+        {% picture post.renditions.card 'card-img my-2' %}
+    """
+    return picture_tag(rendition, css_class, alt)
@@ -0,0 +1,89 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags import cache
+
+from core import metrics
+from core.cache import single_flight
+
+register = template.Library()
+
+
+class MissNodeList(template.NodeList):
+    """Содержимое ``{% cache %}``: рендерится только при промахе и
+    отмечает его в ``render_context`` рендера."""
+
+    def __init__(self, nodes, owner):
+        super().__init__(nodes)
+        self.owner = owner
+
+    def render(self, context):
+        context.render_context[self.owner] = True
+        return super().render(context)
+
+
+class MeteredCacheNode(cache.CacheNode):
+    def __init__(self, nodelist, *args):
+        super().__init__(MissNodeList(nodelist, self), *args)
+
+    def render(self, context):
+        context.render_context[self] = False
+        value = super().render(context)
+        metrics.cache_lookup(hit=not context.render_context[self])
+        return value
+
+
+@register.tag('cache')
+def do_cache(parser, token):
+    """``{% cache %}`` из Django, попадания и промахи которого видны в
+    метриках запроса."""
+    node = cache.do_cache(parser, token)
+    return MeteredCacheNode(node.nodelist, node.expire_time_var,
+                            node.fragment_name, node.vary_on,
+                            node.cache_name)
+
+
+class SingleFlightNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        version = self.version.resolve(context) if self.version else None
+        return single_flight(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            version=version,
+            timeout=None if timeout is None else int(timeout),
+        )
+
+
+@register.tag('singleflight')
+def do_single_flight(parser, token):
+    """Как ``{% cache %}``, но при устаревании фрагмент пересчитывает
+    один запрос, а остальные отдают старую версию.
+
+        {% singleflight None index_page page_obj.number version=generation %}
+            ...
+        {% endsingleflight %}
+    """
+    nodelist = parser.parse(('endsingleflight',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.')
+    version = None
+    if tokens[-1].startswith('version='):
+        version = parser.compile_filter(tokens.pop()[len('version='):])
+    return SingleFlightNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version,
+    )
@@ -0,0 +1,99 @@
+import multiprocessing
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+
+from core.cache import LockingFileBasedCache, single_flight
+
+KEYS = 200
+
+
+def add_keys(location, barrier, results):
+    """Пытается занять все ключи; возвращает, какие достались."""
+    shared = LockingFileBasedCache(location, {})
+    barrier.wait()
+    results.put([key for key in range(KEYS)
+                 if shared.add(f'lock:{key}', True, 30)])
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(side_effect=['первое', 'второе'])
+
+    def test_fresh_value_is_not_recomputed(self):
+        single_flight('key', self.compute, version=1)
+        self.assertEqual(single_flight('key', self.compute, version=1),
+                         'первое')
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_new_version_is_recomputed(self):
+        single_flight('key', self.compute, version=1)
+        self.assertEqual(single_flight('key', self.compute, version=2),
+                         'второе')
+
+    def test_stale_value_is_served_while_locked(self):
+        """Пока другой процесс пересчитывает значение, отдаём старое."""
+        single_flight('key', self.compute, version=1)
+        cache.add('key:lock', True)
+        self.assertEqual(single_flight('key', self.compute, version=2),
+                         'первое')
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_expired_timeout_is_recomputed(self):
+        single_flight('key', self.compute, timeout=0)
+        self.assertEqual(single_flight('key', self.compute, timeout=0),
+                         'второе')
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load single_flight %}'
+            '{% singleflight None fragment name version=version %}'
+            '{{ value }}{% endsingleflight %}'
+        )
+
+        def render(**context):
+            return template.render(Context(context))
+
+        self.assertEqual(render(name='a', version=1, value='x'), 'x')
+        self.assertEqual(render(name='a', version=1, value='y'), 'x')
+        self.assertEqual(render(name='a', version=2, value='y'), 'y')
+
+
+class LockingFileBasedCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_add_is_atomic_across_processes(self):
+        """Каждый ключ занимает ровно один из двух процессов."""
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(2)
+        results = context.Queue()
+        processes = [
+            context.Process(target=add_keys,
+                            args=(self.location, barrier, results))
+            for _ in range(2)
+        ]
+        for process in processes:
+            process.start()
+        won = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(sorted(won[0] + won[1]), list(range(KEYS)))
+
+    def test_add_respects_existing_and_expired_keys(self):
+        shared = LockingFileBasedCache(self.location, {})
+        self.assertTrue(shared.add('key', 'первое'))
+        self.assertFalse(shared.add('key', 'второе'))
+        self.assertEqual(shared.get('key'), 'первое')
+        shared.set('stale', 'старое', -1)
+        self.assertTrue(shared.add('stale', 'новое'))
+        self.assertEqual(shared.get('stale'), 'новое')
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase
+
+from core import db
+
+
+class PragmaTest(TestCase):
+    def test_new_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(db.pragma(cursor, 'synchronous'), 1)
+            self.assertEqual(db.pragma(cursor, 'busy_timeout'), 5000)
+            self.assertEqual(db.pragma(cursor, 'cache_size'), -16 * 1024)
+            self.assertEqual(db.pragma(cursor, 'temp_store'), 2)
+
+    def test_dbmaintain_command(self):
+        stdout = StringIO()
+        call_command('dbmaintain', stdout=stdout, stderr=StringIO())
+        self.assertIn('Освобождено страниц', stdout.getvalue())
+
+
+class MaintenanceTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        default = connections['default']
+        settings_dict = dict(default.settings_dict,
+                             NAME=os.path.join(self.directory, 'db.sqlite3'))
+        self.connection = default.__class__(settings_dict, 'maintenance')
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_file_database_uses_wal_and_incremental_vacuum(self):
+        with self.connection.cursor() as cursor:
+            self.assertEqual(db.pragma(cursor, 'journal_mode'), 'wal')
+            self.assertEqual(db.pragma(cursor, 'auto_vacuum'), 2)
+            cursor.execute('CREATE TABLE junk (id INTEGER PRIMARY KEY, '
+                           'body TEXT)')
+            cursor.execute('CREATE INDEX junk_body ON junk (body)')
+            cursor.executemany('INSERT INTO junk (body) VALUES (%s)',
+                               [('x' * 1000 + str(n),) for n in range(500)])
+            cursor.execute('DELETE FROM junk WHERE id % 2 = 0')
+            self.assertGreater(db.pragma(cursor, 'freelist_count'), 0)
+        report = db.maintain(self.connection, pages=10, pause=0)
+        self.assertTrue(report['incremental'])
+        self.assertGreater(report['freed_pages'], 10)
+        self.assertEqual(report['free_pages'], 0)
+        self.assertIn('checkpoint', report)
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_stat1 "
+                           "WHERE tbl = 'junk'")
+            self.assertTrue(cursor.fetchone()[0])
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+DATA = bytes(range(256)) * 4
+URL = '/media/posts/picture.jpg'
+
+
+class MediaServingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.root, 'posts'))
+        cls.path = os.path.join(cls.root, 'posts', 'picture.jpg')
+        with open(cls.path, 'wb') as picture:
+            picture.write(DATA)
+        cls.settings = override_settings(MEDIA_ROOT=cls.root)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, **headers):
+        response = self.client.get(URL, **headers)
+        if response.streaming:
+            response.body = b''.join(response.streaming_content)
+        return response
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.body, DATA)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(DATA)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_ranges(self):
+        cases = {
+            'bytes=10-19': (10, 19),
+            'bytes=1000-': (1000, 1023),
+            'bytes=-24': (1000, 1023),
+            'bytes=1000-5000': (1000, 1023),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(response.body, DATA[start:end + 1])
+                self.assertEqual(response['Content-Range'],
+                                 f'bytes {start}-{end}/{len(DATA)}')
+                self.assertEqual(response['Content-Length'],
+                                 str(end - start + 1))
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(DATA)}')
+
+    def test_ignored_ranges_send_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=5-1', 'bytes=x-'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.body, DATA)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.body, DATA)
+
+    def test_not_modified(self):
+        first = self.get()
+        for headers in ({'HTTP_IF_NONE_MATCH': first['ETag']},
+                        {'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']}):
+            with self.subTest(headers=headers):
+                response = self.get(**headers)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response['ETag'], first['ETag'])
+                self.assertIn('immutable', response['Cache-Control'])
+
+    def test_changed_file_is_sent(self):
+        response = self.get(HTTP_IF_NONE_MATCH='"old"',
+                            HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_and_outside_files(self):
+        for url in ('/media/posts/missing.jpg', '/media/posts/',
+                    '/media/../settings.py'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_accel_redirect(self):
+        response = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/picture.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_sendfile_header(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.path)
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,108 @@
+import threading
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from core.metrics import Registry, registry
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.staff = User.objects.create_user('admin', is_staff=True)
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/')
+        timing = response['Server-Timing']
+        for name in ('app;dur=', 'db;dur=', 'template;dur=', 'cache;desc='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_server_timing_is_not_public(self):
+        """Server-Timing видят только персонал и владелец токена."""
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+        self.client.force_login(User.objects.create_user('reader'))
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+        response = self.client.get('/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_fragment_cache_lookups_are_counted(self):
+        sources = {
+            'backends': ('{% load single_flight %}'
+                         '{% cache None card 1 %}карточка{% endcache %}'),
+            'jinja2': ('{% call cache_fragment("card", 2) %}'
+                       'карточка{% endcall %}'),
+        }
+        for engine, source in sources.items():
+            with self.subTest(engine=engine):
+                registry.clear()
+                template = engines[engine].from_string(source)
+                for _ in range(3):
+                    self.assertEqual(template.render(), 'карточка')
+                text = registry.render()
+                self.assertIn('yatube_cache_requests_total{result="hit",'
+                              'view=""} 2', text)
+                self.assertIn('yatube_cache_requests_total{result="miss",'
+                              'view=""} 1', text)
+
+    def test_requests_are_aggregated_by_view_name(self):
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/nonexist-page/')
+        self.client.force_login(self.staff)
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="<unresolved>"} 1',
+            text)
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",le="+Inf"}'
+                      ' 2', text)
+        self.assertIn('yatube_cache_requests_total{result="hit",'
+                      'view="posts:index"}', text)
+
+    def test_metrics_are_protected(self):
+        self.assertEqual(self.client.get('/metrics').status_code,
+                         HTTPStatus.FORBIDDEN)
+        self.client.force_login(User.objects.create_user('reader'))
+        self.assertEqual(self.client.get('/metrics').status_code,
+                         HTTPStatus.FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class RegistryTest(TestCase):
+    def test_concurrent_observations_are_not_lost(self):
+        local_registry = Registry()
+
+        def work():
+            for _ in range(1000):
+                local_registry.observe('db_queries', {'view': 'v'}, 3)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        text = local_registry.render()
+        self.assertIn('yatube_db_queries_count{view="v"} 8000', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="2"} 0', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="5"} 8000', text)
+        self.assertIn('yatube_db_queries_sum{view="v"} 24000.0\n', text)
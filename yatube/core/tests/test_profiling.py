@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.profiling import Profiler, make_token
+
+User = get_user_model()
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+def fibonacci(number):
+    return number if number < 2 else (fibonacci(number - 1)
+                                      + fibonacci(number - 2))
+
+
+@override_settings(PROFILE_DIR=PROFILE_DIR, PROFILE_SAMPLE_RATE=0)
+class ProfilerMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        self.staff = User.objects.create_user('admin', is_staff=True)
+        self.reader = User.objects.create_user('reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def files(self):
+        return sorted(os.listdir(PROFILE_DIR)) if os.path.isdir(
+            PROFILE_DIR) else []
+
+    def test_ordinary_requests_are_not_profiled(self):
+        self.client.force_login(self.reader)
+        response = self.client.get('/?profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.files(), [])
+
+    def test_staff_flag_writes_both_files(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/?profile=1')
+        name = response['X-Profile-Id']
+        self.assertIn('posts.index', name)
+        self.assertEqual(self.files(), [f'{name}.collapsed', f'{name}.txt'])
+        with open(os.path.join(PROFILE_DIR, f'{name}.collapsed'),
+                  encoding='utf-8') as stacks:
+            lines = stacks.read().splitlines()
+        view_stacks = [line for line in lines if 'posts/views.py' in line]
+        self.assertTrue(view_stacks)
+        frames, weight = view_stacks[0].rsplit(' ', 1)
+        self.assertTrue(weight.isdigit())
+        self.assertIn('inner (django/core/handlers/exception.py', frames)
+
+    def test_signed_header(self):
+        response = self.client.get('/', HTTP_X_PROFILE=make_token())
+        self.assertIn('X-Profile-Id', response)
+        response = self.client.get('/', HTTP_X_PROFILE='forged:token')
+        self.assertNotIn('X-Profile-Id', response)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampling(self):
+        self.client.get('/')
+        self.assertEqual(len(self.files()), 2)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_KEEP=2)
+    def test_old_profiles_are_pruned(self):
+        for _ in range(4):
+            self.client.get('/')
+        self.assertEqual(len(self.files()), 4)
+
+    def test_browse_page_is_staff_only(self):
+        self.client.force_login(self.staff)
+        name = self.client.get('/?profile=1')['X-Profile-Id']
+        response = self.client.get('/debug/profiles/')
+        self.assertContains(response, f'{name}.txt')
+        summary = self.client.get(f'/debug/profiles/{name}.txt')
+        self.assertEqual(summary.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            self.client.get('/debug/profiles/..%2Fsettings.py').status_code,
+            HTTPStatus.NOT_FOUND)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get('/debug/profiles/').status_code,
+                         HTTPStatus.FORBIDDEN)
+        self.assertEqual(
+            self.client.get(f'/debug/profiles/{name}.txt').status_code,
+            HTTPStatus.FORBIDDEN)
+
+
+class ProfilerTest(TestCase):
+    def test_recursion_is_counted_once_in_cumulative_time(self):
+        with Profiler() as profiler:
+            fibonacci(10)
+        label = next(label for label in profiler.functions
+                     if label.startswith('fibonacci '))
+        calls, own, total = profiler.functions[label]
+        self.assertEqual(calls, 177)
+        self.assertAlmostEqual(own, total, delta=total * 0.05)
+        self.assertIn('fibonacci', profiler.summary(5))
@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.storage import brotli
+
+CSS = ('body { color: black; }\n' * 100).encode()
+
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, 'css'))
+        with open(os.path.join(cls.source, 'css', 'site.css'), 'wb') as css:
+            css.write(CSS)
+        for name in ('tiny.css', 'bootstrap.min.css'):
+            with open(os.path.join(cls.source, 'css', name), 'wb') as css:
+                css.write(b'a{}')
+        cls.settings = override_settings(STATICFILES_DIRS=[cls.source],
+                                         STATIC_ROOT=cls.root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     ignore_patterns=['admin'])
+        with open(os.path.join(cls.root, 'staticfiles.json')) as manifest:
+            cls.hashed = json.load(manifest)['paths']['css/site.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as file:
+            return file.read()
+
+    def test_hashed_files_are_precompressed(self):
+        self.assertRegex(self.hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        self.assertEqual(gzip.decompress(self.read(self.hashed + '.gz')),
+                         CSS)
+        if brotli is not None:
+            self.assertEqual(
+                brotli.decompress(self.read(self.hashed + '.br')), CSS)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, 'css', 'tiny.css.gz')))
+
+    def test_static_tag_uses_hashed_name(self):
+        self.assertEqual(static('css/site.css'), f'/static/{self.hashed}')
+
+    def get(self, path, encoding='gzip, deflate, br', **headers):
+        return self.client.get(f'/static/{path}',
+                               HTTP_ACCEPT_ENCODING=encoding, **headers)
+
+    def test_precompressed_variant_is_served(self):
+        cases = {
+            'gzip, deflate, br': 'br' if brotli else 'gzip',
+            'gzip;q=1.0, br;q=0': 'gzip',
+            'identity': None,
+        }
+        for accept, encoding in cases.items():
+            with self.subTest(accept=accept):
+                response = self.get(self.hashed, accept)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_cache_headers(self):
+        self.assertIn('immutable', self.get(self.hashed)['Cache-Control'])
+        self.assertEqual(self.get('css/site.css')['Cache-Control'],
+                         'no-cache')
+
+    def test_not_modified(self):
+        response = self.get(self.hashed)
+        response = self.get(
+            self.hashed, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_missing_and_outside_files(self):
+        for path in ('css/missing.css', '../settings.py', '%2e%2e/x'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code,
+                                 HTTPStatus.NOT_FOUND)
+
+
+class AssetTagsTest(TestCase):
+    def test_repeated_stylesheet_is_rendered_once(self):
+        template = Template(
+            "{% load assets %}{% stylesheet 'css/a.css' %}"
+            "{% stylesheet 'css/a.css' %}{% stylesheet 'css/b.css' %}")
+        request = RequestFactory().get('/')
+        html = template.render(Context({'request': request}))
+        self.assertEqual(html.count('css/a.css'), 1)
+        self.assertEqual(html.count('<link'), 2)
+
+    def test_base_template_links_bootstrap_once(self):
+        response = self.client.get('/')
+        self.assertEqual(
+            response.content.decode().count('css/bootstrap.min.css'), 1)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from core import media
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage, is_content_name
+
+CONTENT = b'meme' * 1000
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+class StorageMixin:
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        super().tearDown()
+
+
+class ContentAddressedStorageTest(StorageMixin, TestCase):
+    def test_name_is_sharded_hash(self):
+        name = self.storage.save('posts/Cat.JPG', ContentFile(CONTENT))
+        self.assertEqual(name,
+                         f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg')
+        self.assertTrue(is_content_name(name))
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), CONTENT)
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        second = self.storage.save('posts/b.jpg', ContentFile(CONTENT))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(os.listdir(self.storage.path('.incoming')), [])
+
+    def test_legacy_names(self):
+        for name in ('posts/forest.jpg', f'posts/ab/cd/{DIGEST}.jpg', ''):
+            with self.subTest(name=name):
+                self.assertFalse(is_content_name(name))
+
+
+class RefcountTest(StorageMixin, TransactionTestCase):
+    def test_file_is_deleted_with_last_reference(self):
+        name = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        media.retain(name)
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 2)
+        media.release(name, self.storage)
+        self.assertTrue(self.storage.exists(name))
+        media.release(name, self.storage)
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_untracked_files_are_kept(self):
+        name = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        StoredFile.objects.all().delete()
+        media.release(name, self.storage)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_upload_during_pending_delete_keeps_file(self):
+        """Та же картинка, загруженная, пока удаление ждёт коммита,
+        остаётся на диске."""
+        name = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        with transaction.atomic():
+            media.release(name, self.storage)
+            self.assertEqual(
+                self.storage.save('posts/b.jpg', ContentFile(CONTENT)), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task
+def explode():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs_task(self):
+        remember.delay('привет')
+        self.assertEqual(calls, [])
+        self.assertTrue(tasks.run_next())
+        self.assertEqual(calls, ['привет'])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertFalse(tasks.run_next())
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        job = explode.delay()
+        with mock.patch.object(tasks.logger, 'exception'):
+            tasks.run_next()
+            job.refresh_from_db()
+            self.assertEqual(job.status, Task.QUEUED)
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIn('boom', job.last_error)
+            for _ in range(job.max_attempts - 1):
+                Task.objects.update(run_after=timezone.now())
+                tasks.run_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+
+    def test_claimed_task_is_hidden_until_visibility_timeout(self):
+        remember.delay('один раз')
+        self.assertIsNotNone(tasks.claim())
+        self.assertIsNone(tasks.claim())
+        Task.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+        self.assertIsNotNone(tasks.claim())
+
+    def test_expired_task_without_attempts_is_failed(self):
+        """Задача, на которой обработчик умирал каждую попытку, не
+        захватывается бесконечно."""
+        job = remember.delay('убивает обработчик')
+        for _ in range(job.max_attempts):
+            self.assertIsNotNone(tasks.claim())
+            Task.objects.update(
+                run_after=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(tasks.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIsNotNone(job.finished)
+
+    def test_purge_removes_old_done_tasks(self):
+        remember.delay('старая')
+        explode.delay()
+        with mock.patch.object(tasks.logger, 'exception'):
+            Task.objects.update(max_attempts=1)
+            tasks.run_next()
+            tasks.run_next()
+        remember.delay('в очереди')
+        Task.objects.exclude(finished=None).update(
+            finished=timezone.now() - timedelta(days=30))
+        self.assertEqual(tasks.purge(keep=3600), 1)
+        self.assertEqual(
+            sorted(Task.objects.values_list('status', flat=True)),
+            [Task.FAILED, Task.QUEUED])
+
+    def test_runworker_burst_drains_queue(self):
+        for value in range(3):
+            remember.delay(value)
+        call_command('runworker', burst=True, stdout=StringIO())
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
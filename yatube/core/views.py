@@ -1,7 +1,25 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlquote
+from django.views.static import was_modified_since
 
 from http import HTTPStatus
 
+from . import files, profiling
+from .metrics import is_allowed as metrics_allowed, registry
+from .storage import ENCODINGS
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path},
@@ -20,3 +38,145 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus: персоналу или по токену."""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
+def profiles(request):
+    """Список сохранённых профилей запросов для сотрудников."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return render(request, 'core/profiles.html', {
+        'profiles': profiling.saved_profiles(),
+        'token': profiling.make_token(),
+    })
+
+
+def profile_file(request, filename):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    path = profiling.profile_path(filename)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'),
+                        content_type='text/plain; charset=utf-8',
+                        as_attachment=filename.endswith('.collapsed'))
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент не запретил q=0."""
+    accepted = set()
+    for item in header.split(','):
+        name, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+def serve_static(request, path):
+    """Файл из STATIC_ROOT: готовый .br/.gz, если клиент его примет, и
+    вечный кэш для имён с хэшем."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    modified = os.stat(full_path).st_mtime
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              modified):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING',
+                                                   ''))
+    served, content_encoding = full_path, None
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            served, content_encoding = full_path + suffix, encoding
+            break
+    response = FileResponse(open(served, 'rb'),
+                            content_type=content_type
+                            or 'application/octet-stream')
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(modified)
+    hashed_names = getattr(staticfiles_storage, 'hashed_names', ())
+    response['Cache-Control'] = (IMMUTABLE if path in hashed_names
+                                 else 'no-cache')
+    return response
+
+
+def serve_media(request, path):
+    """Файл из MEDIA_ROOT с ETag, Range и вечным кэшем.
+
+    Загруженные картинки и миниатюры не перезаписываются: новое
+    содержимое получает новое имя. При ``MEDIA_ACCEL`` после проверок
+    доступа и валидаторов тело отдаёт фронтовой прокси.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    etag = files.file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        response = media_response(request, path, full_path, stat, etag,
+                                  last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def media_response(request, path, full_path, stat, etag, last_modified):
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = urlquote(
+            settings.MEDIA_ACCEL_PREFIX + path)
+        return response
+    if settings.MEDIA_ACCEL == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+    byte_range = None
+    if files.range_applies(request, etag, last_modified):
+        try:
+            byte_range = files.parse_range(request.META.get('HTTP_RANGE'),
+                                           stat.st_size)
+        except files.RangeNotSatisfiable:
+            response = HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+    response = FileResponse(files.open_range(full_path, byte_range),
+                            content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range is not None:
+        start, end = byte_range
+        response.status_code = HTTPStatus.PARTIAL_CONTENT
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    return response
@@ -1,21 +1,95 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Count
+from django.utils import timezone
 
+from core.paginator import EstimatedCountPaginator
+
+from . import counters, fragments, search
 from .models import Post, Group
 
+BATCH_SIZE = 500
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(Post._meta.get_field('group').remote_field,
+                                  admin.site),
+    )
+
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_in_batches')
 
     empty_value_display = '-пусто-'
 
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление строит страницу подтверждения со всеми
+        # объектами и их связями.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        if not (search.is_available()
+                and search.match_expression(search_term)):
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(
+            pk__in=search.matching_post_ids(search_term)), False
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data['group'] is None:
+            self.message_user(request, 'Выберите группу',
+                              level=messages.WARNING)
+            return
+        group = form.cleaned_data['group']
+        moved = 0
+        posts = queryset.exclude(group=group)
+        for chunk in counters.chunked(posts, BATCH_SIZE):
+            previous = chunk.order_by().values('group').annotate(
+                total=Count('pk'))
+            for row in previous:
+                counters.shift_group(row['group'], -row['total'])
+            count = chunk.update(group=group, updated=timezone.now())
+            counters.shift_group(group.pk, count)
+            moved += count
+        fragments.bump_feed_generation()
+        self.message_user(request, f'Перенесено постов: {moved}')
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_in_batches(self, request, queryset):
+        deleted = 0
+        for chunk in counters.chunked(queryset, BATCH_SIZE):
+            deleted += chunk.delete()[1].get(Post._meta.label, 0)
+        self.message_user(request, f'Удалено постов: {deleted}')
+    delete_in_batches.short_description = 'Удалить выбранные посты'
+    delete_in_batches.allowed_permissions = ('delete',)
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'title', 'description', 'slug')
+    list_display = ('pk', 'title', 'description', 'slug', 'posts_count')
     search_fields = ('pk', 'title', 'description', 'slug')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     empty_value_display = '-пусто-'
@@ -0,0 +1,170 @@
+"""JSON API только для чтения поверх тех же querysets, что и HTML-ленты.
+
+Строки читаются через ``values()``, поэтому объекты моделей не
+создаются. ``?fields=`` ограничивает набор полей, ``?after=`` и
+``?before=`` листают ленту курсором, ``?ids=`` отдаёт посты пачкой.
+"""
+import json
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+
+from .models import Group, Post, User
+from .utils import MAX_ID, KeysetPaginator, valid_id
+
+PER_PAGE = 10
+MAX_PER_PAGE = 100
+MAX_IDS = 100
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'comments_count': 'comments_count',
+    'image': 'image',
+    'thumbnails': 'thumbnails',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _int_param(request, name, default, maximum):
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} должен быть числом')
+    if not 1 <= value <= maximum:
+        raise BadRequest(f'{name} должен быть от 1 до {maximum}')
+    return value
+
+
+def _requested_fields(request, available):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def _rows(queryset, fields, available, date_field):
+    """values() только с нужными колонками, плюс ключ курсора."""
+    lookups = {available[name] for name in fields} | {'id', date_field}
+    return queryset.values(*lookups)
+
+
+def _post(row, fields):
+    item = {name: row[POST_FIELDS[name]] for name in fields}
+    if 'image' in item:
+        item['image'] = (default_storage.url(item['image'])
+                         if item['image'] else None)
+    if 'thumbnails' in item:
+        item['thumbnails'] = (json.loads(item['thumbnails'])
+                              if item['thumbnails'] else {})
+    return item
+
+
+def _comment(row, fields):
+    return {name: row[COMMENT_FIELDS[name]] for name in fields}
+
+
+def _page(request, rows, serialize, fields, date_field):
+    per_page = _int_param(request, 'limit', PER_PAGE, MAX_PER_PAGE)
+    paginator = KeysetPaginator(rows, per_page, date_field=date_field)
+    page = paginator.page(after=request.GET.get('after'),
+                          before=request.GET.get('before'))
+    return JsonResponse({
+        'results': [serialize(row, fields) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def _post_list(request, post_list):
+    try:
+        fields = _requested_fields(request, POST_FIELDS)
+        rows = _rows(post_list, fields, POST_FIELDS, 'pub_date')
+        if 'ids' in request.GET:
+            return _batch(request, rows, fields)
+        return _page(request, rows, _post, fields, 'pub_date')
+    except BadRequest as error:
+        return _error(str(error))
+
+
+def _batch(request, rows, fields):
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise BadRequest('ids должен быть списком чисел через запятую')
+    if not all(valid_id(pk) for pk in ids):
+        raise BadRequest(f'ids должны быть от 0 до {MAX_ID}')
+    if len(ids) > MAX_IDS:
+        raise BadRequest(f'Не больше {MAX_IDS} ids за запрос')
+    found = {row['id']: row for row in rows.filter(pk__in=ids)}
+    return JsonResponse({
+        'results': [_post(found[pk], fields) for pk in ids if pk in found],
+    })
+
+
+def posts(request):
+    return _post_list(request, Post.objects.feed())
+
+
+def group_posts(request, slug):
+    group = Group.objects.only('id').filter(slug=slug).first()
+    if group is None:
+        return _error('Группа не найдена', status=404)
+    return _post_list(request, group.posts.feed())
+
+
+def profile_posts(request, username):
+    author = User.objects.only('id').filter(username=username).first()
+    if author is None:
+        return _error('Пользователь не найден', status=404)
+    return _post_list(request, author.posts.feed())
+
+
+def post_detail(request, post_id):
+    try:
+        fields = _requested_fields(request, POST_FIELDS)
+    except BadRequest as error:
+        return _error(str(error))
+    rows = _rows(Post.objects.feed(), fields, POST_FIELDS, 'pub_date')
+    row = rows.filter(pk=post_id).first()
+    if row is None:
+        return _error('Пост не найден', status=404)
+    return JsonResponse(_post(row, fields))
+
+
+def post_comments(request, post_id):
+    post = Post.objects.only('id').filter(pk=post_id).first()
+    if post is None:
+        return _error('Пост не найден', status=404)
+    try:
+        fields = _requested_fields(request, COMMENT_FIELDS)
+        rows = _rows(post.comments.thread(), fields, COMMENT_FIELDS,
+                     'created')
+        return _page(request, rows, _comment, fields, 'created')
+    except BadRequest as error:
+        return _error(str(error))
@@ -0,0 +1,138 @@
+"""Нагрузочный прогон страниц posts.urls на реалистичном объёме данных.
+
+Данные генерируются Faker и mixer, затем каждый URL приложения, кроме
+меняющих данные по GET, запрашивается тестовым клиентом, а для каждой
+страницы записываются p50/p95 времени ответа, p50 рендера шаблонов (из
+заголовка Server-Timing) и число SQL-запросов.
+"""
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from mixer.backend.django import mixer
+
+from .models import Follow, Group, Post, User
+from .seed import Seeder
+from .urls import app_name, urlpatterns
+
+HOT_THREAD = 2000
+FEED_VIEWS = ('index', 'group_list', 'profile', 'follow_index')
+# Меняют подписки, счётчики и ленты даже на GET: замеры искажали бы
+# следующие страницы и данные базы.
+WRITE_VIEWS = ('profile_follow', 'profile_unfollow')
+TEMPLATE_TIMING_RE = re.compile(r'template;dur=([\d.]+)')
+
+
+def seed(users=1000, groups=20, posts=100000, follows=20,
+         comments_per_post=3, hot_thread=HOT_THREAD, reader_follows=200,
+         seed=0):
+    """Наполняет базу и возвращает объекты, на которых меряются страницы.
+
+    Основной объём даёт ``posts.seed``; читатель с глубокой лентой
+    подписок создаётся mixer'ом и подписывается обычными create(), так
+    что его лента собирается сигналами.
+    """
+    seeder = Seeder(datetime(2024, 1, 1, tzinfo=timezone.utc), seed=seed)
+    user_ids = seeder.users(users)
+    group_ids = seeder.groups(groups)
+    first_post = seeder.posts(posts, user_ids, group_ids)
+    hot_post_id = seeder.comments(first_post, comments_per_post, user_ids,
+                                  hot_thread=hot_thread)
+    seeder.follows(follows, user_ids)
+    seeder.finish()
+    reader = mixer.blend(User, username='reader')
+    for author_id in user_ids[:reader_follows]:
+        Follow.objects.create(user=reader, author_id=author_id)
+    return {
+        'reader': reader,
+        'author': User.objects.get(pk=user_ids[0]),
+        'group': Group.objects.get(pk=group_ids[0]),
+        'post': Post.objects.get(pk=hot_post_id),
+    }
+
+
+def urls(fixtures):
+    """Адреса страниц posts.urls только для чтения с подставленными
+    аргументами."""
+    arguments = {
+        'post_id': fixtures['post'].pk,
+        'username': fixtures['author'].username,
+        'slug': fixtures['group'].slug,
+    }
+    result = {}
+    for pattern in urlpatterns:
+        if pattern.name in WRITE_VIEWS:
+            continue
+        kwargs = {name: arguments[name]
+                  for name in pattern.pattern.converters}
+        result[pattern.name] = reverse(f'{app_name}:{pattern.name}',
+                                       kwargs=kwargs)
+    word = fixtures['post'].text.split()[0]
+    result['search'] += f'?q={quote(word)}'
+    return result
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _template_ms(response):
+    match = TEMPLATE_TIMING_RE.search(response.get('Server-Timing', ''))
+    return float(match.group(1)) if match else 0.0
+
+
+def measure(client, url, repeat=20):
+    """Один прогрев и ``repeat`` замеров одной страницы."""
+    response = client.get(url)
+    timings, templates, queries = [], [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        templates.append(_template_ms(response))
+        queries.append(len(captured))
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'template_p50_ms': round(statistics.median(templates), 2),
+        'queries': max(queries),
+    }
+
+
+def run(fixtures, repeat=20):
+    # Server-Timing отдаётся только с токеном метрик.
+    token = get_random_string(32)
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    client.force_login(fixtures['reader'])
+    with override_settings(METRICS_TOKEN=token):
+        return {name: measure(client, url, repeat)
+                for name, url in urls(fixtures).items()}
+
+
+def compare(previous, current, tolerance=0.2):
+    """Регрессии относительно прошлого отчёта: рост числа запросов или
+    p95 больше чем на ``tolerance``."""
+    problems = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            problems.append(f'{name}: запросов {before["queries"]} → '
+                            f'{result["queries"]}')
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            problems.append(f'{name}: p95 {before["p95_ms"]} → '
+                            f'{result["p95_ms"]} мс')
+    return problems
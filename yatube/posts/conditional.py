@@ -0,0 +1,80 @@
+"""Валидатор ETag для страниц поста, профиля и группы.
+
+Состояние страницы читается одним запросом: последняя правка
+поста/комментария берётся коррелированным подзапросом по индексу,
+удаления и подписки видны через денормализованные счётчики. Если
+клиент прислал актуальный валидатор, view отвечает 304 до пагинатора
+и шаблонов.
+
+Last-Modified не отдаётся: после удаления самого нового поста или
+комментария дата из состояния уходит назад, и по If-Modified-Since
+клиент получил бы 304 на изменившуюся страницу.
+"""
+import hashlib
+
+from django.db.models import OuterRef, Subquery
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from .models import Comment, Group, Post, User
+
+
+def _latest(queryset, field):
+    return Subquery(queryset.filter(**{field: OuterRef('pk')})
+                    .order_by('-updated').values('updated')[:1])
+
+
+def post_state(request, post_id):
+    last_comment = Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by('-created').values('created')[:1])
+    return (
+        Post.objects.filter(pk=post_id)
+        .annotate(last_comment=last_comment)
+        .values_list('updated', 'last_comment', 'comments_count',
+                     'author__stats__posts_count')
+        .first()
+    )
+
+
+def profile_state(request, username):
+    return (
+        User.objects.filter(username=username)
+        .annotate(last_post=_latest(Post.objects.all(), 'author'))
+        .values_list('last_post', 'first_name', 'last_name',
+                     'stats__posts_count', 'stats__followers_count')
+        .first()
+    )
+
+
+def group_state(request, slug):
+    return (
+        Group.objects.filter(slug=slug)
+        .annotate(last_post=_latest(Post.objects.all(), 'group'))
+        .values_list('last_post', 'posts_count', 'title', 'description')
+        .first()
+    )
+
+
+def conditional_page(state):
+    """Условный GET по состоянию страницы из ``state``.
+
+    ETag учитывает ещё пользователя и его CSRF-токен: шапка и формы у
+    каждого свои, а после нового входа токен меняется, и страница из
+    кэша браузера со старым токеном отвечала бы 403 на любую форму.
+    """
+    def get_state(request, *args, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = state(request, *args, **kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        page_state = get_state(request, *args, **kwargs)
+        if page_state is None:
+            return None
+        get_token(request)
+        raw = repr((page_state, request.user.pk,
+                    request.META['CSRF_COOKIE'])).encode()
+        return hashlib.md5(raw).hexdigest()
+
+    return condition(etag_func=etag)
@@ -0,0 +1,90 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _shift(queryset, **deltas):
+    """Атомарно сдвигает счётчики через F(), не опускаясь ниже нуля."""
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def shift_user(user_id, **deltas):
+    _shift(UserStats.objects.filter(user_id=user_id), **deltas)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def shift_post(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def _count_of(queryset, field):
+    """Коррелированный подзапрос COUNT(*) по полю ``field``."""
+    counts = (queryset.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(total=Count('pk'))
+              .values('total'))
+    return Coalesce(Subquery(counts), 0)
+
+
+def chunked(queryset, batch_size):
+    """Обходит queryset диапазонами первичных ключей, каждый диапазон
+    обрабатывается в своей транзакции."""
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        last_pk = pks[-1]
+        with transaction.atomic():
+            yield queryset.filter(pk__gte=pks[0], pk__lte=last_pk)
+
+
+def recount_users(users=None, batch_size=1000):
+    users = User.objects.all() if users is None else users
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    missing = missing.iterator()
+    # Размер одного INSERT Django подбирает сам: явный batch_size в
+    # bulk_create не ограничивается лимитами SQLite.
+    while True:
+        batch = [UserStats(user_id=pk) for pk in islice(missing, batch_size)]
+        if not batch:
+            break
+        UserStats.objects.bulk_create(batch)
+    stats = UserStats.objects.filter(user__in=users.values('pk'))
+    updated = 0
+    for chunk in chunked(stats, batch_size):
+        updated += chunk.update(
+            posts_count=_count_of(Post.objects.all(), 'author'),
+            followers_count=_count_of(Follow.objects.all(), 'author'),
+            following_count=_count_of(Follow.objects.all(), 'user'),
+        )
+    return updated
+
+
+def recount_groups(batch_size=1000):
+    updated = 0
+    for chunk in chunked(Group.objects.all(), batch_size):
+        updated += chunk.update(
+            posts_count=_count_of(Post.objects.all(), 'group'))
+    return updated
+
+
+def recount_posts(batch_size=1000):
+    updated = 0
+    for chunk in chunked(Post.objects.all(), batch_size):
+        updated += chunk.update(
+            comments_count=_count_of(Comment.objects.all(), 'post'))
+    return updated
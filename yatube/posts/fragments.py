@@ -0,0 +1,26 @@
+import time
+
+from django.core.cache import cache
+
+from core import metrics
+
+GENERATION_KEY = 'posts:feed_generation'
+
+
+def feed_generation():
+    """Поколение ленты: входит в ключи закэшированных страниц index."""
+    generation = cache.get(GENERATION_KEY)
+    metrics.cache_lookup(hit=generation is not None)
+    if generation is None:
+        # Начинаем со времени, а не с единицы, чтобы после вытеснения
+        # ключа не совпасть со старыми страницами в кэше.
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, None)
+    return generation
+
+
+def bump_feed_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        feed_generation()
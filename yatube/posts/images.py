@@ -0,0 +1,63 @@
+"""Картинки постов в хранилище по содержимому."""
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core import media
+from core.storage import is_content_name
+
+from . import counters, fragments
+from .models import Post
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+def delete_legacy(names):
+    for name in names:
+        if not Post.objects.filter(image=name).exists():
+            storage().delete(name)
+
+
+def relocate(batch_size=500, keep_old=False):
+    """Переносит картинки, загруженные до хранилища по содержимому, под
+    имена-хэши. Каждая пачка постов — своя транзакция; старые файлы
+    удаляются после её коммита, если на них больше никто не ссылается.
+
+    Возвращает числа перенесённых и ненайденных файлов.
+    """
+    moved = missing = 0
+    posts = Post.objects.exclude(image='')
+    for chunk in counters.chunked(posts, batch_size):
+        old_names = set()
+        for pk, name in chunk.values_list('pk', 'image'):
+            if is_content_name(name):
+                continue
+            if not storage().exists(name):
+                missing += 1
+                continue
+            with storage().open(name) as file:
+                new_name = storage().save(name, file)
+            Post.objects.filter(pk=pk).update(image=new_name,
+                                              updated=timezone.now())
+            old_names.add(name)
+            moved += 1
+        if old_names and not keep_old:
+            transaction.on_commit(
+                lambda names=old_names: delete_legacy(names))
+    if moved:
+        fragments.bump_feed_generation()
+    return moved, missing
+
+
+def recount():
+    """Пересчитывает ссылки на файлы по картинкам постов; возвращает
+    число удалённых файлов без ссылок."""
+    counts = (Post.objects.exclude(image='').order_by()
+              .values_list('image').annotate(total=Count('pk')))
+    with transaction.atomic():
+        return media.set_counts(
+            {name: total for name, total in counts.iterator()
+             if is_content_name(name)},
+            storage())
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Меряет p50/p95 и число запросов всех страниц posts на '
+            'сгенерированных данных во временной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--engine', choices=('django', 'jinja2'),
+                            default='django',
+                            help='Движок шаблонов для страниц лент.')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', metavar='REPORT',
+                            help='Прошлый отчёт для поиска регрессий.')
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in
+                   ('users', 'groups', 'posts', 'comments_per_post',
+                    'follows')}
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            fixtures = benchmark.seed(seed=options['seed'], **volumes)
+            jinja2_views = (benchmark.FEED_VIEWS
+                            if options['engine'] == 'jinja2' else ())
+            with override_settings(JINJA2_VIEWS=jinja2_views):
+                results = benchmark.run(fixtures, repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        report = {
+            'data': dict(volumes, seed=options['seed']),
+            'engine': options['engine'],
+            'repeat': options['repeat'],
+            'views': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f'{name:<20} {result["status"]} '
+                f'p50 {result["p50_ms"]:>8} мс  p95 {result["p95_ms"]:>8} мс  '
+                f'шаблоны {result["template_p50_ms"]:>8} мс  '
+                f'запросов {result["queries"]}'
+            )
+        if options['compare']:
+            with open(options['compare']) as previous_report:
+                previous = json.load(previous_report)['views']
+            for name, result in sorted(results.items()):
+                before = previous.get(name, {}).get('template_p50_ms')
+                if before is not None:
+                    self.stdout.write(
+                        f'{name:<20} шаблоны {before} → '
+                        f'{result["template_p50_ms"]} мс')
+            problems = benchmark.compare(previous, results)
+            if problems:
+                raise CommandError('Регрессии:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт записан в {options["output"]}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в хранилище по содержимому и '
+            'пересчитывает ссылки на файлы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--keep-old', action='store_true',
+                            help='Не удалять файлы под старыми именами.')
+
+    def handle(self, *args, **options):
+        moved, missing = images.relocate(batch_size=options['batch_size'],
+                                         keep_old=options['keep_old'])
+        unused = images.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, не найдено: {missing}, '
+            f'удалено неиспользуемых: {unused}'
+        ))
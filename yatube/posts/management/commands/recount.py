@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = counters.recount_users(batch_size=batch_size)
+        groups = counters.recount_groups(batch_size=batch_size)
+        posts = counters.recount_posts(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: пользователей {users}, групп {groups}, '
+            f'постов {posts}'
+        ))
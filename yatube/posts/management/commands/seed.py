@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seed import Seeder
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ('Быстро наполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--hot-thread', type=int, default=0,
+                            help='Комментариев у самого нового поста.')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Сколько картинок-заглушек создать.')
+        parser.add_argument('--image-share', type=float, default=0.2,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='Глубина разброса дат публикации.')
+        parser.add_argument('--end', type=parse_date,
+                            help='Дата самого свежего поста, ГГГГ-ММ-ДД; '
+                                 'по умолчанию сегодня.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def step(self, title, action, *args, **kwargs):
+        started = time.monotonic()
+        result = action(*args, **kwargs)
+        self.stdout.write(f'{title}: {time.monotonic() - started:.1f} с')
+        return result
+
+    def handle(self, *args, **options):
+        end = options['end'] or datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        seeder = Seeder(end, seed=options['seed'],
+                        batch_size=options['batch_size'],
+                        days=options['days'])
+        try:
+            user_ids = self.step('Пользователи', seeder.users,
+                                 options['users'])
+        except ValueError as error:
+            raise CommandError(error)
+        group_ids = self.step('Группы', seeder.groups, options['groups'])
+        if options['images']:
+            self.step('Картинки', seeder.placeholder_images,
+                      options['images'])
+        first_post = self.step('Посты', seeder.posts, options['posts'],
+                               user_ids, group_ids,
+                               image_share=options['image_share'])
+        self.step('Комментарии', seeder.comments, first_post,
+                  options['comments_per_post'], user_ids,
+                  hot_thread=options['hot_thread'])
+        self.step('Подписки', seeder.follows, options['follows_per_user'],
+                  user_ids)
+        self.step('Счётчики, ленты и поиск', seeder.finish)
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, editable=False, help_text='JSON с адресами заранее нарезанных миниатюр', verbose_name='Миниатюры'),
+        ),
+    ]
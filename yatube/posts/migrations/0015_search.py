@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TOKENIZE = 'tokenize="unicode61 remove_diacritics 2"'
+FOLDED_TEXT = "replace(replace(text, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE posts_post_fts USING fts5(text, {TOKENIZE})')
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_comment_fts USING fts5('
+        f'text, post_id UNINDEXED, {TOKENIZE})')
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts (rowid, text) '
+        f'SELECT id, {FOLDED_TEXT} FROM posts_post')
+    schema_editor.execute(
+        'INSERT INTO posts_comment_fts (rowid, text, post_id) '
+        f'SELECT id, {FOLDED_TEXT}, post_id FROM posts_comment')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_comment_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
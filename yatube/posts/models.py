@@ -1,7 +1,12 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.functional import cached_property
 from django.db.models import CharField, UniqueConstraint
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -12,17 +17,37 @@ class Group(models.Model):
                             help_text='Укажите адрес новой группы')
     description = models.TextField(verbose_name='Описание',
                                    help_text='Укажите информацию о группе')
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число постов'
+    )
 
     def __str__(self) -> CharField:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'id', 'text', 'pub_date', 'updated', 'image', 'thumbnails',
+        'author', 'author__username',
+        'author__first_name', 'author__last_name',
+        'group', 'group__slug', 'group__title',
+    )
+
+    def feed(self):
+        """Посты для ленты: автор и группа одним JOIN, лишние колонки
+        не загружаются."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст',
                             help_text='Укажите текст вашего поста')
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,15 +65,51 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    thumbnails = models.TextField(
+        'Миниатюры',
+        blank=True,
+        editable=False,
+        help_text='JSON с адресами заранее нарезанных миниатюр'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', '-updated'],
+                         name='post_author_updated_idx'),
+            models.Index(fields=['group', '-updated'],
+                         name='post_group_updated_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def renditions(self):
+        """Описания рендиций по именам из settings.POST_THUMBNAILS."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
+
+class CommentQuerySet(models.QuerySet):
+    def thread(self):
+        """Комментарии для страницы поста: автор одним JOIN."""
+        return self.select_related('author').only(
+            'id', 'text', 'created', 'post', 'author', 'author__username')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -67,8 +128,14 @@ class Comment(models.Model):
                             help_text='Введите текст комментария')
     created = models.DateTimeField('Дата публикации', auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -95,3 +162,67 @@ class Follow(models.Model):
             UniqueConstraint(fields=['user', 'author'],
                              name='unique_following')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class Timeline(models.Model):
+    """Лента подписок, разосланная читателям в момент публикации поста."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        # Тот же порядок, что у постов: курсоры ленты и постов совместимы.
+        ordering = ['-pub_date', '-post_id']
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'],
+                             name='unique_timeline_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField('Число подписчиков',
+                                                  default=0)
+    following_count = models.PositiveIntegerField('Число подписок',
+                                                  default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self) -> str:
+        return 'Stats of {}'.format(self.user)
@@ -0,0 +1,206 @@
+import base64
+import binascii
+import math
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Comment, Post
+from .utils import KeysetPage, valid_id
+
+POST_TABLE = 'posts_post_fts'
+COMMENT_TABLE = 'posts_comment_fts'
+# bm25 отрицателен, чем меньше — тем лучше; совпадение в комментарии
+# весит вдвое меньше совпадения в тексте поста.
+COMMENT_WEIGHT = 0.5
+
+# Суффикс теневых таблиц, в которые строится новый индекс.
+SHADOW = '_new'
+# Запас на сохранения, начатые до перестройки и закоммиченные после.
+REBUILD_OVERLAP = timedelta(minutes=1)
+TABLES = {
+    POST_TABLE: (Post, ['text'], 'updated'),
+    COMMENT_TABLE: (Comment, ['text', 'post_id'], 'created'),
+}
+CREATE_TABLE = ('CREATE VIRTUAL TABLE {} USING fts5({}, '
+                'tokenize="unicode61 remove_diacritics 2")')
+
+
+# unicode61 снимает диакритику только с латиницы, «ё» сводим к «е» сами.
+FOLDED_TEXT = "replace(replace(text, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def fold(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово ищется по префиксу, все слова обязательны."""
+    words = re.findall(r'\w+', fold(query))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(
+            f'INSERT INTO {POST_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, fold(post.text)])
+
+
+def unindex_post(post):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s',
+                       [post.pk])
+
+
+def index_comment(comment):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s',
+                       [comment.pk])
+        cursor.execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+            'VALUES (%s, %s, %s)',
+            [comment.pk, fold(comment.text), comment.post_id])
+
+
+def unindex_comment(comment):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s',
+                       [comment.pk])
+
+
+def _copy_rows(cursor, table, model, columns, condition, params):
+    values = [FOLDED_TEXT if column == 'text' else column
+              for column in columns]
+    cursor.execute(
+        f'INSERT OR REPLACE INTO {table} (rowid, {", ".join(columns)}) '
+        f'SELECT id, {", ".join(values)} FROM {model._meta.db_table} '
+        f'WHERE {condition}',
+        params)
+
+
+def _rebuild_table(table, model, columns, batch_size):
+    source = model._meta.db_table
+    last_pk = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT MAX(id) FROM (SELECT id FROM {source} '
+                'WHERE id > %s ORDER BY id LIMIT %s)',
+                [last_pk, batch_size])
+            chunk_end = cursor.fetchone()[0]
+            if chunk_end is None:
+                return
+            _copy_rows(cursor, table, model, columns,
+                       'id > %s AND id <= %s', [last_pk, chunk_end])
+        last_pk = chunk_end
+
+
+def rebuild(batch_size=5000):
+    """Строит индекс заново в теневых таблицах порциями по
+    ``batch_size`` строк и подменяет ими рабочие в одной транзакции.
+
+    Пока идёт перестройка, поиск и сигналы работают со старым индексом.
+    Перед подменой в новый индекс переносятся посты и комментарии,
+    сохранённые за это время, и убираются удалённые.
+    """
+    started = timezone.now() - REBUILD_OVERLAP
+    with connection.cursor() as cursor:
+        for table, (model, columns, _) in TABLES.items():
+            cursor.execute(f'DROP TABLE IF EXISTS {table}{SHADOW}')
+            definition = ', '.join(
+                column if column == 'text' else f'{column} UNINDEXED'
+                for column in columns)
+            cursor.execute(CREATE_TABLE.format(table + SHADOW, definition))
+    for table, (model, columns, _) in TABLES.items():
+        _rebuild_table(table + SHADOW, model, columns, batch_size)
+    since = connection.ops.adapt_datetimefield_value(started)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table, (model, columns, changed) in TABLES.items():
+            _copy_rows(cursor, table + SHADOW, model, columns,
+                       f'{changed} >= %s', [since])
+            cursor.execute(
+                f'DELETE FROM {table}{SHADOW} WHERE rowid NOT IN '
+                f'(SELECT id FROM {model._meta.db_table})')
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(
+                f'ALTER TABLE {table}{SHADOW} RENAME TO {table}')
+
+
+def matching_post_ids(query):
+    """Подзапрос с id постов, в тексте которых есть все слова запроса."""
+    return RawSQL(
+        f'SELECT rowid FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s',
+        [match_expression(query)])
+
+
+def encode_cursor(score, post_id):
+    raw = f'{score!r}:{post_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        score, post_id = raw.decode().split(':')
+        score, post_id = float(score), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not math.isfinite(score) or not valid_id(post_id):
+        return None
+    return score, post_id
+
+
+def search(query, after=None, per_page=10):
+    """Страница постов, найденных по тексту поста или его комментариев,
+    от более релевантных к менее релевантным."""
+    expression = match_expression(query)
+    if not expression:
+        return KeysetPage([], None)
+    if not is_available():
+        posts = list(Post.objects.feed().filter(text__icontains=query)
+                     [:per_page])
+        return KeysetPage(posts, None)
+    position = decode_cursor(after) if after else None
+    having, params = '', [expression, COMMENT_WEIGHT, expression]
+    if position is not None:
+        having = 'HAVING score > %s OR (score = %s AND post_id > %s)'
+        params += [position[0], position[0], position[1]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT post_id, MIN(weight) AS score FROM ('
+            f'SELECT rowid AS post_id, bm25({POST_TABLE}) AS weight '
+            f'FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s '
+            'UNION ALL '
+            f'SELECT post_id, bm25({COMMENT_TABLE}) * %s AS weight '
+            f'FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s'
+            f') GROUP BY post_id {having} '
+            'ORDER BY score, post_id LIMIT %s',
+            params + [per_page + 1])
+        rows = cursor.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.feed().in_bulk([post_id for post_id, _ in rows])
+    return KeysetPage(
+        [posts[post_id] for post_id, _ in rows if post_id in posts],
+        None,
+        next_cursor=encode_cursor(*rows[-1][::-1]) if has_more else None,
+    )
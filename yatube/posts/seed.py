@@ -0,0 +1,216 @@
+"""Массовая генерация синтетических данных.
+
+Строки вставляются пачками по ``batch_size``, каждая пачка в своей
+транзакции, поэтому память не растёт с объёмом: в памяти живут только
+id пользователей и групп. Пользователи и группы идут через
+bulk_create, а посты, комментарии и подписки — готовыми кортежами
+через executemany: на миллионах строк подготовка значений в ORM
+обходится дороже самой вставки. Тексты собираются из
+заранее сгенерированного Faker'ом словаря фраз, а все случайные
+решения принимает один ``random.Random(seed)``, так что при том же
+``seed`` и ``end`` получаются те же данные.
+
+Сигналы при этом не срабатывают, поэтому в конце ``finish()`` пересчитывает
+счётчики, ленты подписок и поисковый индекс.
+"""
+import io
+import random
+from itertools import islice
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from faker import Faker
+from PIL import Image
+
+from . import counters, fragments, images, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+PHRASES = 2000
+NAMES = 300
+NO_GROUP_SHARE = 0.3
+
+
+class Seeder:
+    def __init__(self, end, seed=0, batch_size=5000, days=3 * 365):
+        self.end = end
+        self.span = timedelta(days=days).total_seconds()
+        self.seed = seed
+        self.prefix = f'seed{seed}-'
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.phrases = [fake.sentence() for _ in range(PHRASES)]
+        self.first_names = [fake.first_name() for _ in range(NAMES)]
+        self.last_names = [fake.last_name() for _ in range(NAMES)]
+        self.images = []
+        self.adapt_date = connection.ops.adapt_datetimefield_value
+
+    def _bulk(self, model, objects, **kwargs):
+        """Вставляет объекты пачками, каждую в своей транзакции."""
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                created += self._flush(model, batch, **kwargs)
+                batch = []
+        if batch:
+            created += self._flush(model, batch, **kwargs)
+        return created
+
+    @staticmethod
+    def _flush(model, batch, **kwargs):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, **kwargs)
+        return len(batch)
+
+    def _insert(self, model, fields, rows, ignore_conflicts=False):
+        """Вставляет кортежи значений ``fields`` через executemany."""
+        ops = connection.ops
+        columns = ', '.join(ops.quote_name(model._meta.get_field(name).column)
+                            for name in fields)
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=ignore_conflicts)} '
+            f'{ops.quote_name(model._meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts)}'
+        )
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def _text(self, low, high):
+        return ' '.join(self.rng.choices(self.phrases,
+                                         k=self.rng.randint(low, high)))
+
+    def _popular(self, ids):
+        """Выбор со степенным перекосом: первые id заметно популярнее."""
+        return ids[int(len(ids) * self.rng.random() ** 3)]
+
+    def _date(self, position):
+        """Дата ``position``-й из долей [0, 1) записи: за ``days`` до
+        ``end``, к концу плотнее.
+
+        Даты растут вместе с id, как в живой базе, поэтому вставка
+        дописывает индексы по дате с краю, а не в случайные страницы.
+        """
+        return self.end - timedelta(seconds=(1 - position) ** 2 * self.span)
+
+    def users(self, count):
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise ValueError(f'Данные с seed={self.seed} уже загружены')
+        self._bulk(User, (
+            User(username=f'{self.prefix}{number}',
+                 first_name=self.rng.choice(self.first_names),
+                 last_name=self.rng.choice(self.last_names),
+                 email=f'{self.prefix}{number}@example.com',
+                 password='!', date_joined=self.end)
+            for number in range(count)
+        ))
+        return list(User.objects.filter(username__startswith=self.prefix)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def groups(self, count):
+        self._bulk(Group, (
+            Group(title=self._text(1, 1)[:200],
+                  slug=f'{self.prefix}{number}',
+                  description=self._text(1, 3))
+            for number in range(count)
+        ))
+        return list(Group.objects.filter(slug__startswith=self.prefix)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def placeholder_images(self, count):
+        """Несколько однотонных картинок, общих для всех постов; лежат в
+        хранилище по содержимому, ссылки на них пересчитывает
+        ``finish``."""
+        for number in range(count):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = io.BytesIO()
+            Image.new('RGB', (960, 540), color).save(content, 'PNG')
+            self.images.append(images.storage().save(
+                f'posts/{self.prefix}{number}.png',
+                ContentFile(content.getvalue())))
+        return self.images
+
+    def posts(self, count, author_ids, group_ids, image_share=0.0):
+        """Создаёт посты и возвращает id первого из них."""
+        first = (Post.objects.order_by('-pk')
+                 .values_list('pk', flat=True).first() or 0) + 1
+
+        def generate():
+            for number in range(count):
+                date = self.adapt_date(self._date(number / count))
+                image = ''
+                if self.images and self.rng.random() < image_share:
+                    image = self.rng.choice(self.images)
+                group_id = None
+                if group_ids and self.rng.random() >= NO_GROUP_SHARE:
+                    group_id = self.rng.choice(group_ids)
+                yield (self._popular(author_ids), group_id,
+                       self._text(1, 8), image, '', date, date, 0)
+
+        self._insert(Post, ('author', 'group', 'text', 'image', 'thumbnails',
+                            'pub_date', 'updated', 'comments_count'),
+                     generate())
+        return first
+
+    def comments(self, first_post, per_post, user_ids, hot_thread=0):
+        """В среднем ``per_post`` комментариев на пост после ``first_post``
+        и ``hot_thread`` комментариев у самого нового из них."""
+        posts = Post.objects.filter(pk__gte=first_post)
+        hot_post = posts.order_by('-pub_date', '-pk').values_list(
+            'pk', 'pub_date').first()
+
+        def thread(post_id, pub_date, size):
+            for _ in range(size):
+                created = pub_date + (self.end - pub_date) * self.rng.random()
+                yield (post_id, self._popular(user_ids), self._text(1, 2),
+                       self.adapt_date(created))
+
+        def generate():
+            for chunk in counters.chunked(posts, self.batch_size):
+                rows = chunk.order_by('pk').values_list('pk', 'pub_date')
+                for post_id, pub_date in rows:
+                    yield from thread(post_id, pub_date,
+                                      self.rng.randint(0, 2 * per_post))
+            if hot_post and hot_thread:
+                yield from thread(*hot_post, hot_thread)
+
+        self._insert(Comment, ('post', 'author', 'text', 'created'),
+                     generate())
+        return hot_post[0] if hot_post else None
+
+    def follows(self, per_user, user_ids):
+        # Популярность у читателей не связана с плодовитостью, иначе
+        # ленты подписок раздуваются квадратично.
+        targets = list(user_ids)
+        self.rng.shuffle(targets)
+
+        def generate():
+            for user_id in user_ids:
+                authors = {self._popular(targets)
+                           for _ in range(self.rng.randint(0, 2 * per_user))}
+                authors.discard(user_id)
+                for author_id in sorted(authors):
+                    yield user_id, author_id
+
+        self._insert(Follow, ('user', 'author'), generate(),
+                     ignore_conflicts=True)
+
+    def finish(self):
+        """Восстанавливает всё, что обычно поддерживают сигналы."""
+        counters.recount_users(batch_size=self.batch_size)
+        counters.recount_groups(batch_size=self.batch_size)
+        counters.recount_posts(batch_size=self.batch_size)
+        timeline.rebuild(batch_size=self.batch_size)
+        if search.is_available():
+            search.rebuild(batch_size=self.batch_size)
+        if self.images:
+            images.recount()
+        fragments.bump_feed_generation()
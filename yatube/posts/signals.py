@@ -0,0 +1,159 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.core.files.base import ContentFile
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import media
+
+from . import counters, fragments, search, tasks, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля автора, которые видны в карточке поста.
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = (Post.objects.filter(pk=instance.pk)
+                    .values('author_id', 'group_id', 'image').first())
+    if previous is not None:
+        instance._previous_author_id = previous['author_id']
+        instance._previous_group_id = previous['group_id']
+        instance._previous_image = previous['image']
+    instance._image_changed = (
+        (previous['image'] if previous else '') != (instance.image.name or '')
+    )
+    if instance._image_changed:
+        instance.thumbnails = ''
+    # Ссылку на новую загрузку берёт хранилище при сохранении файла.
+    instance._image_uploaded = bool(instance.image
+                                    and not instance.image._committed)
+    if instance._image_uploaded:
+        # Новая загрузка: оригинал сохраняется уже без EXIF.
+        content = thumbnails.strip_metadata(instance.image.file)
+        if content is not None:
+            instance.image.file = ContentFile(content)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    fragments.bump_feed_generation()
+    search.index_post(instance)
+    if instance.image and getattr(instance, '_image_changed', False):
+        tasks.make_thumbnails.delay(instance.pk)
+    previous_image = getattr(instance, '_previous_image', '')
+    uploaded = getattr(instance, '_image_uploaded', False)
+    if previous_image != instance.image.name:
+        if not uploaded:
+            media.retain(instance.image.name)
+        media.release(previous_image, instance.image.storage)
+        instance._previous_image = instance.image.name
+    elif uploaded:
+        # Загрузили ту же картинку: ссылка, взятая хранилищем, лишняя.
+        media.release(instance.image.name, instance.image.storage)
+    if created:
+        counters.shift_user(instance.author_id, posts_count=1)
+        counters.shift_group(instance.group_id, 1)
+        timeline.fan_out(instance)
+        return
+    previous_author_id = getattr(instance, '_previous_author_id',
+                                 instance.author_id)
+    if previous_author_id != instance.author_id:
+        counters.shift_user(previous_author_id, posts_count=-1)
+        counters.shift_user(instance.author_id, posts_count=1)
+        timeline.reassign(instance)
+    previous_group_id = getattr(instance, '_previous_group_id',
+                                instance.group_id)
+    if previous_group_id != instance.group_id:
+        counters.shift_group(previous_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    fragments.bump_feed_generation()
+    media.release(instance.image.name, instance.image.storage)
+    search.unindex_post(instance)
+    counters.shift_user(instance.author_id, posts_count=-1)
+    counters.shift_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    """Карточки постов показывают группу, поэтому её изменение
+    считается правкой всех её постов."""
+    if not raw:
+        Post.objects.filter(group=instance).update(updated=timezone.now())
+        fragments.bump_feed_generation()
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_name(sender, instance, raw, update_fields, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+            AUTHOR_FIELDS):
+        # Вход пользователя сохраняет только last_login.
+        return
+    instance._previous_name = (User.objects.filter(pk=instance.pk)
+                               .values_list(*AUTHOR_FIELDS).first())
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, raw, **kwargs):
+    """Карточки постов показывают имя автора, поэтому его изменение
+    считается правкой всех его постов."""
+    previous = getattr(instance, '_previous_name', None)
+    if raw or previous is None:
+        return
+    current = tuple(getattr(instance, field) for field in AUTHOR_FIELDS)
+    instance._previous_name = current
+    if previous != current:
+        Post.objects.filter(author=instance).update(updated=timezone.now())
+        fragments.bump_feed_generation()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    search.index_comment(instance)
+    if created:
+        counters.shift_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.unindex_comment(instance)
+    counters.shift_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.shift_user(instance.user_id, following_count=1)
+        counters.shift_user(instance.author_id, followers_count=1)
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.shift_user(instance.user_id, following_count=-1)
+    counters.shift_user(instance.author_id, followers_count=-1)
+    timeline.purge(instance)
+    if timeline.dropped_below_limit(instance.author_id):
+        tasks.backfill_timeline.delay(instance.author_id)
@@ -0,0 +1,13 @@
+from core.tasks import task
+
+from . import thumbnails, timeline
+
+
+@task
+def make_thumbnails(post_id):
+    thumbnails.generate(post_id)
+
+
+@task
+def backfill_timeline(author_id):
+    timeline.backfill_author(author_id)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import EstimatedCountPaginator
+
+from ..models import Group, Post, User
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(title='Старая', slug='old')
+        cls.new_group = Group.objects.create(title='Новая', slug='new')
+        cls.posts = [
+            Post.objects.create(author=cls.admin, text=f'Пост {i}',
+                                group=cls.group)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка постов не зависит от числа строк."""
+        before = self.changelist_queries()
+        other = User.objects.create_user(username='other')
+        for i in range(5):
+            Post.objects.create(author=other, text=f'Ещё {i}',
+                                group=self.new_group)
+        self.assertEqual(self.changelist_queries(), before)
+
+    def test_move_to_group_action(self):
+        self.admin_client.post(self.url, {
+            'action': 'move_to_group',
+            '_selected_action': [post.pk for post in self.posts[:2]],
+            'group': self.new_group.pk,
+        })
+        self.assertEqual(
+            Post.objects.filter(group=self.new_group).count(), 2)
+        self.group.refresh_from_db()
+        self.new_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.new_group.posts_count, 2)
+
+    def test_delete_in_batches_action(self):
+        self.admin_client.post(self.url, {
+            'action': 'delete_in_batches',
+            '_selected_action': [post.pk for post in self.posts],
+        })
+        self.assertFalse(Post.objects.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_estimated_count_uses_statistics(self):
+        """После ANALYZE общее число строк берётся из статистики,
+        отфильтрованный список считается точно."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        paginator.exact_below = 0
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(pk=self.posts[0].pk), 10)
+        paginator.exact_below = 0
+        self.assertEqual(paginator.count, 1)
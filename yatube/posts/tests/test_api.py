@@ -0,0 +1,88 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}',
+                                group=cls.group)
+            for i in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get(self, name, kwargs=None, **params):
+        response = self.guest_client.get(reverse(name, kwargs=kwargs),
+                                         params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feeds_use_cursor_pagination(self):
+        """Ленты отдаются страницами, курсор ведёт на следующую."""
+        feeds = (
+            ('posts:api_posts', None),
+            ('posts:api_group_posts', {'slug': self.group.slug}),
+            ('posts:api_profile_posts', {'username': self.user.username}),
+        )
+        newest_first = [post.pk for post in reversed(self.posts)]
+        for name, kwargs in feeds:
+            with self.subTest(name=name):
+                status, first = self.get(name, kwargs, limit=2)
+                self.assertEqual(status, 200)
+                status, second = self.get(name, kwargs, limit=2,
+                                          after=first['next'])
+                self.assertEqual(
+                    [item['id'] for item in first['results']
+                     + second['results']],
+                    newest_first,
+                )
+                self.assertIsNone(second['next'])
+
+    def test_sparse_fieldsets(self):
+        status, data = self.get('posts:api_posts', fields='id,author')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['results'][0],
+                         {'id': self.posts[-1].pk, 'author': 'lev'})
+        status, data = self.get('posts:api_posts', fields='password')
+        self.assertEqual(status, 400)
+
+    def test_batch_lookup_keeps_requested_order(self):
+        ids = f'{self.posts[0].pk},999,{self.posts[2].pk}'
+        status, data = self.get('posts:api_posts', ids=ids, fields='id')
+        self.assertEqual(data['results'],
+                         [{'id': self.posts[0].pk}, {'id': self.posts[2].pk}])
+
+    def test_batch_lookup_rejects_out_of_range_ids(self):
+        for ids in ('99999999999999999999', f'{self.posts[0].pk},-1'):
+            with self.subTest(ids=ids):
+                status, data = self.get('posts:api_posts', ids=ids)
+                self.assertEqual(status, 400)
+                self.assertIn('error', data)
+
+    def test_post_and_comments(self):
+        post = self.posts[0]
+        status, data = self.get('posts:api_post', {'post_id': post.pk})
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['thumbnails'], {})
+        status, data = self.get('posts:api_post_comments',
+                                {'post_id': post.pk})
+        self.assertEqual([item['id'] for item in data['results']],
+                         [self.comment.pk])
+        status, data = self.get('posts:api_post', {'post_id': 999})
+        self.assertEqual(status, 404)
+
+    def test_feed_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('posts:api_posts'))
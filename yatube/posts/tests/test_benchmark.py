@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Follow
+from ..urls import urlpatterns
+
+
+class BenchmarkTest(TestCase):
+    def test_every_read_only_url_is_measured(self):
+        fixtures = benchmark.seed(users=5, groups=2, posts=30, follows=2,
+                                  comments_per_post=1, hot_thread=5,
+                                  reader_follows=3)
+        follows = set(Follow.objects.values_list('user', 'author'))
+        results = benchmark.run(fixtures, repeat=1)
+        self.assertEqual(set(results),
+                         {pattern.name for pattern in urlpatterns}
+                         - set(benchmark.WRITE_VIEWS))
+        self.assertEqual(set(Follow.objects.values_list('user', 'author')),
+                         follows)
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 400)
+                self.assertGreater(result['queries'], 0)
+                self.assertIn('template_p50_ms', result)
+
+    def test_compare_reports_regressions(self):
+        previous = {'index': {'queries': 3, 'p95_ms': 10.0}}
+        self.assertEqual(benchmark.compare(
+            previous, {'index': {'queries': 3, 'p95_ms': 11.0}}), [])
+        self.assertEqual(len(benchmark.compare(
+            previous, {'index': {'queries': 4, 'p95_ms': 20.0}})), 2)
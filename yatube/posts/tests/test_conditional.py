@@ -0,0 +1,83 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from ..models import Comment, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(author=cls.user, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:profile', kwargs={'username': 'lev'}),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+        )
+
+    def etags(self):
+        return [self.guest_client.get(url)['ETag'] for url in self.urls]
+
+    def test_matching_etag_answers_304_after_one_query(self):
+        """Актуальный ETag даёт 304 за один запрос к базе."""
+        for url, etag in zip(self.urls, self.etags()):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified(self):
+        """Дата из состояния может уйти назад, поэтому валидатор — только
+        ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_csrf_token_changes_etag(self):
+        """После нового входа страница со старым CSRF-токеном не отдаётся
+        из кэша браузера."""
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        self.guest_client.cookies['csrftoken'] = get_random_string(64)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changes_invalidate_etags(self):
+        """Правка поста, новый комментарий и удаление меняют ETag."""
+        before = self.etags()
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        after_comment = self.etags()
+        self.assertNotEqual(after_comment[0], before[0])
+        second = Post.objects.create(author=self.user, text='Второй',
+                                     group=self.group)
+        after_create = self.etags()
+        self.assertNotEqual(after_create[1], after_comment[1])
+        self.assertNotEqual(after_create[2], after_comment[2])
+        Post.objects.filter(pk=second.pk).delete()
+        after_delete = self.etags()
+        self.assertNotEqual(after_delete[1], after_create[1])
+        self.assertNotEqual(after_delete[2], after_create[2])
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertNotEqual(self.etags()[2], after_delete[2])
+
+    def test_etag_depends_on_user(self):
+        client = Client()
+        client.force_login(self.user)
+        url = self.urls[0]
+        self.assertNotEqual(client.get(url)['ETag'],
+                            self.guest_client.get(url)['ETag'])
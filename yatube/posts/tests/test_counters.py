@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.reader = User.objects.create_user(username='test')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_create_and_delete_update_counters(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост', 'group': self.group.id},
+        )
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        Post.objects.get(author=self.user).delete()
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_post_edit_moves_group_counter(self):
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.group)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.id,)),
+            data={'text': 'Пост', 'group': self.other_group.id},
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+    def test_author_change_moves_posts_counter(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        post.author = self.reader
+        post.save()
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(self.stats(self.reader).posts_count, 1)
+        post.save()
+        self.assertEqual(self.stats(self.reader).posts_count, 1)
+
+    def test_add_comment_updates_counter(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            data={'text': 'Коммент'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.user.username,)))
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.user.username,)))
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.user.username,)))
+        self.assertEqual(self.stats(self.user).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_recount_command_repairs_counters(self):
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Пост', group=self.group)
+             for _ in range(3)])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.user)])
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('recount', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.user).posts_count, 3)
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -54,6 +55,7 @@ class PostFormTests(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
         form_data = {
             'text': 'Тестовый пост',
             'group': self.test_group.id,
@@ -73,7 +75,7 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=form_data['text'],
                 author=self.user,
-                image=f'posts/{uploaded.name}'
+                image=f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
             ).exists())
 
     def test_post_edit_form(self):
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import is_content_name
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedImagesTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lev')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(author=self.user, text='Мем', image=image)
+
+    def upload(self, name='meme.gif'):
+        return self.create_post(SimpleUploadedFile(name, SMALL_GIF,
+                                                   'image/gif'))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload('first.gif')
+        second = self.upload('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(StoredFile.objects.get().refcount, 2)
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.image = SimpleUploadedFile('other.gif', SMALL_GIF + b'\0',
+                                          'image/gif')
+        second.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().name, second.image.name)
+
+    def test_reupload_of_same_content_keeps_one_reference(self):
+        post = self.upload('first.gif')
+        post.image = SimpleUploadedFile('again.gif', SMALL_GIF, 'image/gif')
+        post.save()
+        self.assertEqual(StoredFile.objects.get().refcount, 1)
+        path = post.image.path
+        post.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_migrate_media_rewrites_legacy_files(self):
+        legacy = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'old.gif')
+        os.makedirs(os.path.dirname(legacy), exist_ok=True)
+        with open(legacy, 'wb') as file:
+            file.write(SMALL_GIF)
+        posts = [self.create_post('posts/old.gif') for _ in range(2)]
+        posts.append(self.create_post('posts/missing.gif'))
+        current = self.upload()
+        self.assertEqual(StoredFile.objects.get().refcount, 1)
+        call_command('migrate_media', batch_size=1, stdout=StringIO())
+        names = [Post.objects.get(pk=post.pk).image.name for post in posts]
+        self.assertEqual(names[:2], [current.image.name] * 2)
+        self.assertEqual(names[2], 'posts/missing.gif')
+        self.assertFalse(os.path.exists(legacy))
+        stored = StoredFile.objects.get()
+        self.assertEqual((stored.name, stored.refcount),
+                         (current.image.name, 3))
+        self.assertTrue(is_content_name(stored.name))
@@ -0,0 +1,81 @@
+import re
+
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+FEED_VIEWS = ['index', 'group_list', 'profile', 'follow_index']
+HREF_RE = re.compile(r'href="([^"]*)"')
+
+
+class JinjaFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', first_name='Лев',
+                                              last_name='Толстой')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Первая\nвторая')
+        for number in range(15):
+            Post.objects.create(
+                author=cls.author, group=cls.group if number % 2 else None,
+                text=f'Пост {number}\n<b>жирный</b>')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:follow_index'),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def get(self, url, engine_views):
+        cache.clear()
+        with override_settings(JINJA2_VIEWS=engine_views):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_jinja_pages_match_django_pages(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                django_html = self.get(url, [])
+                jinja_html = self.get(url, FEED_VIEWS)
+                self.assertEqual(HREF_RE.findall(jinja_html),
+                                 HREF_RE.findall(django_html))
+                self.assertIn('Пост 13<br>&lt;b&gt;жирный&lt;/b&gt;',
+                              jinja_html)
+
+    def test_switch_is_per_view(self):
+        with override_settings(JINJA2_VIEWS=['profile']):
+            index = self.client.get(self.urls[0])
+            profile = self.client.get(self.urls[2])
+        self.assertTemplateUsed(index, 'posts/index.html')
+        self.assertTemplateNotUsed(profile, 'posts/profile.html')
+        self.assertIn('Всего постов: 15', profile.content.decode())
+
+    def test_post_cards_are_cached(self):
+        with override_settings(JINJA2_VIEWS=FEED_VIEWS):
+            self.client.get(self.urls[0])
+            Post.objects.filter(author=self.author).update(text='Изменён')
+            html = self.client.get(self.urls[0]).content.decode()
+        self.assertIn('Пост 14', html)
+        self.assertNotIn('Изменён', html)
+
+    def test_addclass_filter(self):
+        class Form(forms.Form):
+            text = forms.CharField()
+
+        template = engines['jinja2'].from_string(
+            '{{ form.text|addclass("form-control") }}')
+        self.assertIn('class="form-control"',
+                      template.render({'form': Form()}))
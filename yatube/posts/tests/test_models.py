@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -31,3 +31,37 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_post_length = post.text[:15]
         self.assertEqual(expected_post_length, str(post))
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают данные по составным индексам."""
+        feed = Post.objects.feed()
+        queries = {
+            'post_pub_date_idx': feed,
+            'post_group_pub_date_idx': feed.filter(group=self.group),
+            'post_author_pub_date_idx': feed.filter(author=self.user),
+            'comment_post_created_idx': self.post.comments.all(),
+            'follow_author_user_idx': Follow.objects.filter(
+                author=self.user),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                plan = queryset.explain()
+                self.assertRegex(plan, rf'INDEX {index}\b')
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,106 @@
+import base64
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.in_text = Post.objects.create(author=cls.user,
+                                          text='Ёжик в тумане')
+        cls.in_comment = Post.objects.create(author=cls.user,
+                                             text='Про лошадку')
+        Comment.objects.create(post=cls.in_comment, author=cls.user,
+                               text='Там был ёжик')
+        cls.other = Post.objects.create(author=cls.user, text='Совсем другое')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query, **params):
+        response = self.guest_client.get(reverse('posts:search'),
+                                         {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_post_text_ranks_above_comment(self):
+        """Совпадение в тексте поста выше совпадения в комментарии,
+        регистр и диакритика не важны."""
+        self.assertEqual([post.pk for post in self.found('ежик')],
+                         [self.in_text.pk, self.in_comment.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Сигналы держат индекс в актуальном состоянии."""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Ёжик вернулся'
+        other.save()
+        self.assertIn(other, list(self.found('ежик')))
+        Post.objects.filter(pk=self.in_text.pk).delete()
+        Comment.objects.filter(post=self.in_comment).delete()
+        self.assertEqual(list(self.found('ежик')), [self.other])
+
+    def test_cursor_pagination(self):
+        """Следующая страница продолжает выдачу с курсора."""
+        first = search.search('ежик', per_page=1)
+        self.assertEqual(list(first), [self.in_text])
+        second = self.found('ежик', after=first.next_cursor)
+        self.assertEqual(list(second), [self.in_comment])
+        self.assertFalse(second.has_next())
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(list(self.found('"ежик" OR NEAR(')), [])
+        self.assertEqual(list(self.found('***')), [])
+
+    def test_admin_uses_index(self):
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ежик'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.in_text])
+
+    def test_forged_cursor_is_ignored(self):
+        """Курсор с бесконечной оценкой или id вне диапазона базы
+        считается битым."""
+        for raw in ('1.0:99999999999999999999', 'nan:1', 'inf:1',
+                    '1.0:-1'):
+            token = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                self.assertIsNone(search.decode_cursor(token))
+                self.assertEqual(len(self.found('ежик', after=token)), 2)
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search', '--batch-size', '1',
+                     stdout=StringIO())
+        self.assertEqual(len(self.found('ежик')), 2)
+
+    def test_writes_during_rebuild_survive_swap(self):
+        """Пока строятся теневые таблицы, поиск идёт по старому индексу,
+        а сохранённое и удалённое за это время попадает в новый."""
+        rebuild_table = search._rebuild_table
+        created = []
+
+        def rebuild_and_write(table, *args):
+            rebuild_table(table, *args)
+            if table.startswith(search.POST_TABLE):
+                self.assertEqual(len(self.found('ежик')), 2)
+                created.append(Post.objects.create(author=self.user,
+                                                   text='Ежик в кармане'))
+                Post.objects.filter(pk=self.in_text.pk).delete()
+
+        with mock.patch.object(search, '_rebuild_table',
+                               side_effect=rebuild_and_write):
+            search.rebuild(batch_size=1)
+        self.assertEqual([post.pk for post in self.found('ежик')],
+                         [created[0].pk, self.in_comment.pk])
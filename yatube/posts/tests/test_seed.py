@@ -0,0 +1,79 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import is_content_name
+
+from ..models import Comment, Follow, Group, Post, Timeline, User, UserStats
+
+
+class SeedCommandTest(TestCase):
+    def seed(self, **options):
+        call_command('seed', '--end', '2024-01-01', users=20, groups=3,
+                     posts=200, comments_per_post=2, follows_per_user=3,
+                     hot_thread=30, batch_size=50, stdout=StringIO(),
+                     **options)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            list(Comment.objects.order_by('pk').values_list(
+                'post__text', 'author__username', 'created')),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_creates_requested_volumes(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertGreaterEqual(Comment.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_same_seed_gives_same_data(self):
+        self.seed()
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_signal_maintained_state_is_rebuilt(self):
+        """Счётчики и ленты совпадают с тем, что дали бы сигналы."""
+        self.seed()
+        for stats in UserStats.objects.select_related('user'):
+            self.assertEqual(stats.posts_count,
+                             Post.objects.filter(author=stats.user).count())
+        for group in Group.objects.annotate(total=Count('posts')):
+            self.assertEqual(group.posts_count, group.total)
+        expected = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list('author', flat=True)
+        )
+        self.assertEqual(Timeline.objects.count(), expected)
+
+    def test_images_are_content_addressed_and_counted(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            self.seed(images=3, image_share=0.5)
+        counts = dict(Post.objects.exclude(image='').order_by()
+                      .values_list('image').annotate(total=Count('pk')))
+        self.assertTrue(counts)
+        self.assertTrue(all(is_content_name(name) for name in counts))
+        self.assertEqual(dict(StoredFile.objects.values_list('name',
+                                                             'refcount')),
+                         counts)
+
+    def test_refuses_to_reseed(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
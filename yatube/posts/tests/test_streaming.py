@@ -0,0 +1,77 @@
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+FEED_VIEWS = ['index', 'group_list', 'profile', 'follow_index']
+
+
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for number in range(12):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:follow_index'),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_stream_matches_rendered_page(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with override_settings(JINJA2_VIEWS=FEED_VIEWS):
+                    rendered = self.client.get(url).content
+                cache.clear()
+                with override_settings(STREAMING_VIEWS=FEED_VIEWS):
+                    response = self.client.get(url)
+                    self.assertTrue(response.streaming)
+                    streamed = b''.join(response.streaming_content)
+                self.assertEqual(streamed, rendered)
+
+    @override_settings(STREAMING_VIEWS=FEED_VIEWS)
+    def test_head_is_sent_before_posts_are_queried(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                chunks = iter(response.streaming_content)
+                with CaptureQueriesContext(connection) as queries:
+                    head = next(chunks).decode()
+                self.assertIn('bootstrap.min.css', head)
+                self.assertIn('</header>', head)
+                self.assertNotIn('<article>', head)
+                self.assertFalse(any('posts_post' in query['sql']
+                                     for query in queries))
+                cards = [chunk for chunk in chunks if b'<article>' in chunk]
+                # Главная кэширует ленту целиком и отдаёт её одним куском.
+                self.assertEqual(len(cards), 1 if url == self.urls[0] else 10)
+
+    @override_settings(STREAMING_VIEWS=FEED_VIEWS)
+    def test_missing_group_is_still_404(self):
+        response = self.client.get(reverse('posts:group_list',
+                                           args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.streaming)
+
+    @override_settings(STREAMING_VIEWS=['profile'])
+    def test_switch_is_per_view(self):
+        self.assertFalse(self.client.get(self.urls[0]).streaming)
+        self.assertTrue(self.client.get(self.urls[2]).streaming)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import tasks, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_upload_schedules_thumbnails(self):
+        with mock.patch.object(tasks.make_thumbnails, 'delay') as delay:
+            post = self.create_post()
+            post.text = 'Новый текст'
+            post.save()
+        delay.assert_called_once_with(post.pk)
+
+    def test_generate_stores_rendition_urls(self):
+        with mock.patch.object(tasks.make_thumbnails, 'delay'):
+            post = self.create_post()
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(set(post.renditions),
+                         set(settings.POST_THUMBNAILS))
+        card = post.renditions['card']
+        self.assertTrue(card['src'].startswith(settings.MEDIA_URL))
+        self.assertTrue(card['src'].endswith('-card-480.jpg'))
+        # Картинка 2x1 не раздувается до всех ширин.
+        self.assertEqual((card['width'], card['height']), (480, 170))
+        self.assertEqual(card['srcset'], f'{card["src"]} 480w')
+        self.assertIn(['image/webp', card['src'][:-3] + 'webp 480w'],
+                      card['sources'])
+
+    def test_new_image_drops_old_renditions(self):
+        with mock.patch.object(tasks.make_thumbnails, 'delay') as delay:
+            post = self.create_post()
+            thumbnails.generate(post.pk)
+            post.refresh_from_db()
+            post.image = SimpleUploadedFile('other.gif', SMALL_GIF,
+                                            'image/gif')
+            post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.renditions, {})
+        self.assertEqual(delay.call_count, 2)
+
+    def jpeg(self, size, exif):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return buffer.getvalue()
+
+    def test_widths_and_formats(self):
+        with mock.patch.object(tasks.make_thumbnails, 'delay'):
+            post = Post.objects.create(
+                author=self.user, text='Большая картинка',
+                image=SimpleUploadedFile('big.jpg',
+                                         self.jpeg((2000, 1000), b''),
+                                         'image/jpeg'))
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        card = post.renditions['card']
+        self.assertEqual((card['width'], card['height']), (960, 339))
+        self.assertEqual(
+            [item.rsplit(' ', 1)[1] for item in card['srcset'].split(', ')],
+            ['480w', '720w', '960w'])
+        path = os.path.join(settings.MEDIA_ROOT,
+                            card['src'][len(settings.MEDIA_URL):])
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (960, 339))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+        for type_, srcset in card['sources']:
+            self.assertEqual(srcset.count('w, ') + 1, 3)
+
+    def test_upload_drops_exif_and_applies_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera'
+        with mock.patch.object(tasks.make_thumbnails, 'delay'):
+            post = Post.objects.create(
+                author=self.user, text='Фото с телефона',
+                image=SimpleUploadedFile('photo.jpg',
+                                         self.jpeg((40, 20), exif),
+                                         'image/jpeg'))
+        with Image.open(post.image.path) as image:
+            self.assertFalse(image.getexif())
+            self.assertEqual(image.size, (20, 40))
+
+    def test_picture_tag(self):
+        template = Template('{% load pictures %}'
+                            '{% picture rendition "card-img" %}')
+        rendition = {
+            'src': '/media/a-960.jpg', 'width': 960, 'height': 339,
+            'sizes': '100vw', 'srcset': '/media/a-960.jpg 960w',
+            'sources': [['image/webp', '/media/a-960.webp 960w']],
+        }
+        html = template.render(Context({'rendition': rendition}))
+        self.assertHTMLEqual(
+            html,
+            '<picture><source type="image/webp" '
+            'srcset="/media/a-960.webp 960w" sizes="100vw">'
+            '<img class="card-img" src="/media/a-960.jpg" '
+            'srcset="/media/a-960.jpg 960w" sizes="100vw" width="960" '
+            'height="339" alt="" loading="lazy" decoding="async">'
+            '</picture>')
+        self.assertIn('src="/media/old.jpg"', template.render(
+            Context({'rendition': '/media/old.jpg'})))
+        self.assertEqual(template.render(Context({'rendition': None})), '')
@@ -0,0 +1,108 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import claim, execute
+
+from ..models import Follow, Post, Timeline, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='lev')
+        cls.reader = User.objects.create_user(username='test')
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='Старый пост')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_page_posts(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_post_fans_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            list(Timeline.objects.filter(user=self.reader)
+                 .values_list('post', flat=True)),
+            [new_post.pk, self.old_post.pk],
+        )
+        self.assertEqual(self.follow_page_posts(),
+                         [new_post.pk, self.old_post.pk])
+
+    def test_unfollow_purges_timeline(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page_posts(), [])
+
+    def test_author_change_moves_post_between_timelines(self):
+        other = User.objects.create_user(username='other')
+        other_reader = User.objects.create_user(username='other_reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other_reader, author=other)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        post.author = other
+        post.save()
+        self.assertEqual(
+            list(Timeline.objects.filter(post=post)
+                 .values_list('user', 'author')),
+            [(other_reader.pk, other.pk)],
+        )
+        self.assertEqual(self.follow_page_posts(), [self.old_post.pk])
+
+    def test_follow_page_reads_timeline_index(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        plan = Timeline.objects.filter(user=self.reader).explain()
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_read_on_demand(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page_posts(),
+                         [new_post.pk, self.old_post.pk])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_posts_backfilled_when_author_drops_below_limit(self):
+        """Посты, опубликованные, пока автор был выше лимита, попадают в
+        ленты, когда подписчиков становится меньше."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(Timeline.objects.filter(post=new_post).exists())
+        Follow.objects.filter(user=other).delete()
+        execute(claim())
+        self.assertFalse(Task.objects.filter(status=Task.QUEUED).exists())
+        self.assertEqual(
+            list(Timeline.objects.filter(user=self.reader)
+                 .values_list('post', flat=True)),
+            [new_post.pk, self.old_post.pk],
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_cursor_survives_following_celebrity(self):
+        """Курсор из ленты годится для чтения через JOIN с подписками."""
+        celebrity = User.objects.create_user(username='celebrity')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=celebrity)
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(12)]
+        first = self.reader_client.get(reverse('posts:follow_index'))
+        Follow.objects.create(user=self.reader, author=celebrity)
+        second = self.reader_client.get(
+            reverse('posts:follow_index'),
+            {'after': first.context['page_obj'].next_cursor})
+        pages = [post.pk for response in (first, second)
+                 for post in response.context['page_obj']]
+        self.assertEqual(pages, [post.pk for post in posts[::-1]]
+                         + [self.old_post.pk])
@@ -1,15 +1,21 @@
+import base64
+import hashlib
 import shutil
 import tempfile
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.paginator import InvalidPage
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Post, Group, Follow
+from ..models import Comment, Post, Group, Follow
+from ..utils import decode_cursor, encode_cursor
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -29,6 +35,8 @@ class PostViewsTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
+        cls.image_name = f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
         cls.image = SimpleUploadedFile(
             name='forest.jpg',
             content=small_gif,
@@ -97,7 +105,7 @@ class PostViewsTests(TestCase):
             Post.objects.filter(
                 text=self.posts[11].text,
                 author=self.user,
-                image='posts/forest.jpg'
+                image=self.image_name
             ).exists())
         self.assertEqual(len(response.context['page_obj']), 10)
 
@@ -117,7 +125,7 @@ class PostViewsTests(TestCase):
             Post.objects.filter(
                 text=self.posts[11].text,
                 author=self.user,
-                image='posts/forest.jpg'
+                image=self.image_name
             ).exists())
         self.assertEqual(len(response.context['page_obj']), 10)
 
@@ -136,7 +144,7 @@ class PostViewsTests(TestCase):
             Post.objects.filter(
                 text=self.posts[11].text,
                 author=self.user,
-                image='posts/forest.jpg'
+                image=self.image_name
             ).exists())
         self.assertEqual(len(response.context['page_obj']), 10)
 
@@ -156,7 +164,7 @@ class PostViewsTests(TestCase):
             Post.objects.filter(
                 text=self.posts[11].text,
                 author=self.user,
-                image='posts/forest.jpg'
+                image=self.image_name
             ).exists())
 
     def test_post_edit_page_shows_correct_context(self):
@@ -211,28 +219,51 @@ class PostViewsTests(TestCase):
         self.assertEqual(all_posts, 0)
 
     def test_index_cache(self):
+        """Главная отдаётся из кэша, пока пост не изменён."""
         cache.clear()
         post_test = Post.objects.create(
             author=self.user,
             text='Тестовый пост1',
             group=self.group
         )
-        response = self.authorized_client.get(
-            reverse('posts:index')
-        )
-        response1 = response.content
-        post_test.delete()
-        response = self.authorized_client.get(
-            reverse('posts:index')
-        )
-        response2 = response.content
+        response1 = self.authorized_client.get(reverse('posts:index')).content
+        Post.objects.filter(pk=post_test.pk).update(text='Без сигнала')
+        response2 = self.authorized_client.get(reverse('posts:index')).content
         self.assertEqual(response1, response2)
-        cache.clear()
-        response = self.authorized_client.get(
-            reverse('posts:index')
-        )
-        response3 = response.content
+        post_test.text = 'Изменённый пост'
+        post_test.save()
+        response3 = self.authorized_client.get(reverse('posts:index')).content
         self.assertNotEqual(response1, response3)
+        self.assertIn(post_test.text.encode(), response3)
+        post_test.delete()
+        response4 = self.authorized_client.get(reverse('posts:index')).content
+        self.assertNotIn(post_test.text.encode(), response4)
+
+    def test_group_change_invalidates_index_cards(self):
+        cache.clear()
+        group = Group.objects.create(title='Группа', slug='old-slug',
+                                     description='Описание')
+        Post.objects.create(author=self.user, text='Пост', group=group)
+        self.authorized_client.get(reverse('posts:index'))
+        group.slug = 'renamed-slug'
+        group.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIn(b'/group/renamed-slug/', response.content)
+
+    def test_author_rename_invalidates_index_cards(self):
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIn('Лев Толстой', response.content.decode())
+
+    def test_login_does_not_touch_posts(self):
+        updated = list(Post.objects.values_list('updated', flat=True))
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(
+            list(Post.objects.values_list('updated', flat=True)), updated)
 
     def test_post_for_followers(self):
         Post.objects.create(
@@ -293,3 +324,183 @@ class PaginatorViewsTest(TestCase):
             response = self.authorized_client.get(reverse_name + '?page=2')
             self.assertIn('page_obj', response.context)
             self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_keyset_next_page_contains_remaining_posts(self):
+        """Курсор ?after= ведёт на следующую страницу."""
+        for template, reverse_name in self.paginator_list.items():
+            with self.subTest(reverse_name=reverse_name):
+                cache.clear()
+                first_page = self.authorized_client.get(
+                    reverse_name).context['page_obj']
+                cache.clear()
+                response = self.authorized_client.get(
+                    reverse_name + f'?after={first_page.next_cursor}')
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 2)
+                self.assertFalse(page_obj.has_next())
+                self.assertTrue(page_obj.has_previous())
+
+    def test_keyset_previous_page_matches_first_page(self):
+        cache.clear()
+        reverse_name = self.paginator_list['posts:index']
+        first_page = self.authorized_client.get(
+            reverse_name).context['page_obj']
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            second_page = self.authorized_client.get(
+                reverse_name + f'?after={first_page.next_cursor}'
+            ).context['page_obj']
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in queries.captured_queries))
+        cache.clear()
+        response = self.authorized_client.get(
+            reverse_name + f'?before={second_page.previous_cursor}')
+        page_obj = response.context['page_obj']
+        self.assertEqual([post.pk for post in page_obj],
+                         [post.pk for post in first_page])
+        self.assertFalse(page_obj.has_previous())
+
+    def test_keyset_page_has_no_page_numbers(self):
+        reverse_name = self.paginator_list['posts:index']
+        first_page = self.authorized_client.get(
+            reverse_name).context['page_obj']
+        page_obj = self.authorized_client.get(
+            reverse_name, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        for method in (page_obj.next_page_number,
+                       page_obj.previous_page_number):
+            with self.subTest(method=method.__name__):
+                with self.assertRaises(InvalidPage):
+                    method()
+
+    def test_page_cache_key_ignores_raw_cursor(self):
+        """Выдуманные курсоры, ведущие на одну страницу, дают один ключ
+        кэша."""
+        cache.clear()
+        reverse_name = self.paginator_list['posts:index']
+        first_page = self.authorized_client.get(
+            reverse_name).context['page_obj']
+        keys = set()
+        for after in (first_page.next_cursor, first_page.next_cursor + '=',
+                      first_page.next_cursor + '=='):
+            keys.add(self.authorized_client.get(
+                reverse_name, {'after': after}).context['page_obj'].cache_key)
+        self.assertEqual(len(keys), 1)
+        keys = {self.authorized_client.get(
+            reverse_name, {'after': f'junk{number}'}
+        ).context['page_obj'].cache_key for number in range(3)}
+        self.assertEqual(len(keys), 1)
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(post)),
+                         (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('не-курсор'))
+
+    def test_cursor_with_out_of_range_id_is_ignored(self):
+        """Курсор с id вне диапазона базы — битый токен, а не ошибка 500."""
+        for pk in (2 ** 63, 99999999999999999999, -1):
+            token = base64.urlsafe_b64encode(
+                f'0:{pk}'.encode()).decode().rstrip('=')
+            self.assertIsNone(decode_cursor(token))
+            for name in ('posts:index', 'posts:api_posts'):
+                for param in ('after', 'before'):
+                    with self.subTest(pk=pk, name=name, param=param):
+                        response = self.authorized_client.get(
+                            reverse(name), {param: token})
+                        self.assertEqual(response.status_code, 200)
+
+
+class FeedQueryCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.user_following = User.objects.create_user(username='test')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user_following, author=cls.user)
+        cls.feed_urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.following_client = Client()
+        self.following_client.force_login(self.user_following)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.following_client.get(url)
+        return len(queries)
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов на страницу ленты не растёт вместе с постами."""
+        Post.objects.create(author=self.user, text='Пост', group=self.group)
+        single_post_queries = {
+            url: self.count_queries(url) for url in self.feed_urls
+        }
+        for i in range(9):
+            author = User.objects.create_user(username=f'author{i}')
+            Post.objects.create(author=author, text='Пост', group=self.group)
+            Post.objects.create(author=self.user, text='Пост',
+                                group=Group.objects.create(
+                                    title=f'Группа {i}', slug=f'group-{i}',
+                                    description='Описание'))
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url),
+                                 single_post_queries[url])
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='lev')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post,
+                    author=User.objects.create_user(username=f'reader{i}'),
+                    text=f'Коммент {i}')
+            for i in range(25)
+        ])
+        cls.detail_url = reverse('posts:post_detail', args=(cls.post.id,))
+        cls.comments_url = reverse('posts:post_comments',
+                                   args=(cls.post.id,))
+
+    def test_post_detail_renders_first_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertTrue(comments.has_next())
+        self.assertLess(len(queries), 10)
+
+    def test_comments_endpoint_loads_the_rest(self):
+        first_page = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.comments_url, {'after': first_page.next_cursor})
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_comments_endpoint_json_is_the_api(self):
+        """JSON комментариев один: тот же, что в API, и курсор из
+        HTML-страницы к нему подходит."""
+        api_url = reverse('posts:api_post_comments', args=(self.post.id,))
+        self.assertEqual(
+            self.client.get(self.comments_url, {'format': 'json'}).json(),
+            self.client.get(api_url).json())
+        first_page = self.client.get(self.detail_url).context['comments']
+        data = self.client.get(self.comments_url, {
+            'format': 'json', 'after': first_page.next_cursor}).json()
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         [f'Коммент {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next'])
@@ -0,0 +1,164 @@
+"""Нарезка картинок постов под ``srcset``.
+
+Каждая рендиция из ``settings.POST_THUMBNAILS`` режется в нескольких
+ширинах и форматах: современные из ``settings.POST_IMAGE_FORMATS``,
+которые умеет сохранять Pillow (AVIF — с плагином ``pillow-avif``), и
+прогрессивный JPEG для остальных браузеров. EXIF и прочие метаданные в
+рендиции не попадают, поворот из EXIF применяется заранее.
+
+Имена файлов строятся из хэша оригинала, поэтому одинаковые картинки
+режутся один раз, а адреса можно кэшировать навсегда.
+"""
+import hashlib
+import json
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core import metrics
+
+from . import fragments
+from .models import Post
+
+try:
+    import pillow_avif  # noqa: F401 регистрирует формат AVIF в Pillow
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+FALLBACK = 'JPEG'
+QUALITY = {'AVIF': 55, 'WEBP': 80, 'JPEG': 85}
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp',
+              'JPEG': 'image/jpeg'}
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+# Форматы, в которых метаданные оригинала переписываются при загрузке.
+STRIPPED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+ORIENTATION = 0x0112
+
+
+def formats():
+    """Форматы рендиций: доступные современные, затем запасной."""
+    Image.init()
+    return [format_ for format_ in settings.POST_IMAGE_FORMATS
+            if format_ in Image.SAVE] + [FALLBACK]
+
+
+def encode(image, format_):
+    buffer = BytesIO()
+    options = {'quality': QUALITY[format_]}
+    if format_ == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    image.save(buffer, format_, **options)
+    return buffer.getvalue()
+
+
+def render(source, digest, name, size, widths, sizes):
+    """Файлы одной рендиции и её описание для шаблона."""
+    base_width, base_height = size
+    widths = sorted(width for width in widths
+                    if width <= max(source.width, min(widths)))
+    srcsets = {}
+    for width in widths:
+        height = round(base_height * width / base_width)
+        resized = ImageOps.fit(source, (width, height), Image.LANCZOS)
+        resized.info['icc_profile'] = source.info.get('icc_profile')
+        for format_ in formats():
+            path = 'cache/renditions/{}/{}-{}-{}.{}'.format(
+                digest[:2], digest, name, width, EXTENSIONS[format_])
+            if not default_storage.exists(path):
+                path = default_storage.save(
+                    path, ContentFile(encode(resized, format_)))
+            srcsets.setdefault(format_, []).append(
+                f'{default_storage.url(path)} {width}w')
+    src = srcsets[FALLBACK][-1].rsplit(' ', 1)[0]
+    return {
+        'src': src,
+        'width': widths[-1],
+        'height': round(base_height * widths[-1] / base_width),
+        'sizes': sizes,
+        'srcset': ', '.join(srcsets.pop(FALLBACK)),
+        'sources': [[MIME_TYPES[format_], ', '.join(srcset)]
+                    for format_, srcset in srcsets.items()],
+    }
+
+
+def open_source(field_file):
+    with field_file.open('rb') as file:
+        content = file.read()
+    image = Image.open(BytesIO(content))
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.info['icc_profile'] = icc_profile
+    return image, hashlib.sha1(content).hexdigest()[:20]
+
+
+def generate(post_id):
+    """Нарезает все рендиции поста и сохраняет их описания в строке
+    поста."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    try:
+        with metrics.timer('thumbnail'):
+            source, digest = open_source(post.image)
+            renditions = {
+                name: render(source, digest, name, **options)
+                for name, options in settings.POST_THUMBNAILS.items()
+            }
+    except (OSError, ValueError):
+        logger.exception('Cannot make thumbnails for post %s', post_id)
+        return
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=json.dumps(renditions), updated=timezone.now())
+    fragments.bump_feed_generation()
+
+
+def strip_metadata(file):
+    """Содержимое загруженной картинки без EXIF и XMP или None, если
+    убирать нечего.
+
+    Поворот из EXIF применяется к пикселям, цветовой профиль остаётся.
+    """
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            if image.format not in STRIPPED_FORMATS:
+                return None
+            if not (image.getexif() or 'xmp' in image.info
+                    or 'XML:com.adobe.xmp' in image.info):
+                return None
+            options = {'exif': b''}
+            if image.info.get('icc_profile'):
+                options['icc_profile'] = image.info['icc_profile']
+            if image.format == 'JPEG':
+                options['quality'] = 95
+            elif image.format == 'WEBP':
+                options['quality'] = QUALITY['WEBP']
+            if (image.format == 'JPEG'
+                    and image.getexif().get(ORIENTATION, 1) == 1):
+                # Пиксели не меняются: таблицы квантования оригинала.
+                cleaned, options['quality'] = image, 'keep'
+            else:
+                cleaned = ImageOps.exif_transpose(image)
+            buffer = BytesIO()
+            cleaned.save(buffer, image.format, **options)
+    except (OSError, ValueError):
+        return None
+    finally:
+        file.seek(0)
+    return buffer.getvalue()
@@ -0,0 +1,143 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+from . import counters
+from .models import Follow, Post, PostQuerySet, Timeline, UserStats
+from .utils import paginate_page
+
+BATCH_SIZE = 1000
+
+
+def _insert(entries):
+    """Вставляет записи ленты пачками, не держа их все в памяти."""
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _is_celebrity(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def _follows_celebrity(user):
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if _is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _insert(
+        Timeline(user_id=user_id, post_id=post.pk,
+                 author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту нового подписчика уже опубликованные посты."""
+    if _is_celebrity(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id).values_list('pk', 'pub_date')
+    _insert(
+        Timeline(user_id=follow.user_id, post_id=post_id,
+                 author_id=follow.author_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def reassign(post):
+    """Переносит пост в ленты подписчиков его нового автора."""
+    Timeline.objects.filter(post=post).delete()
+    fan_out(post)
+
+
+def purge(follow):
+    Timeline.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id).delete()
+
+
+def _fill(follows):
+    """Раскладывает посты авторов по лентам подписок из ``follows``,
+    пропуская авторов с лимитом подписчиков и уже разложенные посты."""
+    follow_ids, params = follows.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {Timeline._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.author_id, '
+            'post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            f'JOIN {UserStats._meta.db_table} stats '
+            'ON stats.user_id = follow.author_id '
+            f'WHERE follow.id IN ({follow_ids}) '
+            'AND stats.followers_count < %s',
+            [*params, settings.TIMELINE_FANOUT_LIMIT],
+        )
+
+
+def dropped_below_limit(author_id):
+    """После отписки: автор только что опустился ниже лимита, и его
+    посты, не разосланные, пока подписчиков было больше, нужно
+    разложить через ``backfill_author``."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT - 1,
+    ).exists()
+
+
+def backfill_author(author_id, batch_size=1000):
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    follows = Follow.objects.filter(author_id=author_id)
+    for chunk in counters.chunked(follows, batch_size):
+        _fill(chunk)
+
+
+def rebuild(batch_size=1000):
+    """Заново раскладывает ленты по всем подпискам, пачками подписок.
+
+    Нужно после массовой загрузки через bulk_create, которая обходит
+    сигналы. Посты авторов с лимитом подписчиков не раскладываются.
+    """
+    Timeline.objects.all().delete()
+    for chunk in counters.chunked(Follow.objects.all(), batch_size):
+        _fill(chunk)
+
+
+def follow_page(request, user, post_per_page=10):
+    """Страница ленты подписок.
+
+    Обычно это одно чтение по индексу ленты пользователя. Если
+    пользователь подписан на автора, посты которого не рассылаются,
+    лента собирается при чтении через JOIN с Follow. Оба пути
+    упорядочены по (дата, id поста), поэтому курсоры одного годятся для
+    другого, и подписка между страницами не ломает листание.
+    """
+    if _follows_celebrity(user):
+        post_list = Post.objects.feed().filter(author__following__user=user)
+        return paginate_page(request, post_list, post_per_page)
+    entries = (
+        Timeline.objects.filter(user=user)
+        .select_related('post__author', 'post__group')
+        .only('pub_date', 'post',
+              *(f'post__{field}' for field in PostQuerySet.FEED_FIELDS))
+    )
+    page_obj = paginate_page(request, entries, post_per_page,
+                             key_field='post_id')
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
@@ -1,8 +1,162 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
 
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-def paginate_page(request, post_list, post_per_page=10):
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Наибольший первичный ключ, который примет база (SQLite INTEGER).
+MAX_ID = 2 ** 63 - 1
+
+
+def valid_id(pk):
+    """True для id, которые можно передать в запрос к базе."""
+    return 0 <= pk <= MAX_ID
+
+
+def encode_cursor(obj, date_field='pub_date', key_field='pk'):
+    """Кодирует позицию объекта (дата, id) в непрозрачный токен.
+
+    ``obj`` может быть и словарём из ``values()`` с ключами ``id`` и
+    ``date_field``. ``key_field`` — поле со вторым ключом, если это не
+    первичный ключ самого объекта.
+    """
+    if isinstance(obj, dict):
+        date = obj[date_field]
+        pk = obj['id' if key_field == 'pk' else key_field]
+    else:
+        date, pk = getattr(obj, date_field), getattr(obj, key_field)
+    stamp = (date - EPOCH) // timedelta(microseconds=1)
+    raw = f'{stamp}:{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен битый."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        stamp, pk = raw.decode().split(':')
+        date, pk = EPOCH + timedelta(microseconds=int(stamp)), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        return None
+    return (date, pk) if valid_id(pk) else None
+
+
+class KeysetPage(Page):
+    """Страница курсорной пагинации: без COUNT и без номеров страниц.
+
+    Соседние страницы открываются по ``next_cursor`` и
+    ``previous_cursor``; ``next_page_number()`` и
+    ``previous_page_number()`` бросают ``InvalidPage``.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    @cached_property
+    def cache_key(self):
+        """Ключ кэша по содержимому страницы, а не по строке запроса:
+        выдуманные курсоры не заводят новых записей в кэше."""
+        first = self.object_list[0].pk if self.object_list else ''
+        last = self.object_list[-1].pk if self.object_list else ''
+        return 'k{}-{}-{:d}{:d}'.format(first, last, self.has_next(),
+                                        self.has_previous())
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        raise InvalidPage('Keyset pages have no numbers, use next_cursor')
+
+    def previous_page_number(self):
+        raise InvalidPage(
+            'Keyset pages have no numbers, use previous_cursor')
+
+
+class KeysetPaginator:
+    """Пагинация по ключу (дата, id) через токены ?after= и ?before=.
+
+    Каждая страница стоит одного запроса LIMIT per_page + 1
+    независимо от глубины.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 key_field='pk'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+        self.key_field = key_field
+
+    def cursor(self, obj):
+        return encode_cursor(obj, self.date_field, self.key_field)
+
+    def page(self, after=None, before=None):
+        position = decode_cursor(before) if before else None
+        if position is not None:
+            return self._page_before(*position)
+        position = decode_cursor(after) if after else None
+        return self._page_after(position)
+
+    def _page_after(self, position):
+        field, key = self.date_field, self.key_field
+        queryset = self.object_list.order_by(f'-{field}', f'-{key}')
+        if position is not None:
+            date, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': date})
+                | Q(**{field: date, f'{key}__lt': pk})
+            )
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        return KeysetPage(
+            objects,
+            self,
+            next_cursor=self.cursor(objects[-1]) if has_more else None,
+            previous_cursor=(self.cursor(objects[0])
+                             if position is not None and objects else None),
+        )
+
+    def _page_before(self, date, pk):
+        field, key = self.date_field, self.key_field
+        queryset = self.object_list.order_by(field, key).filter(
+            Q(**{f'{field}__gt': date})
+            | Q(**{field: date, f'{key}__gt': pk})
+        )
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page][::-1]
+        return KeysetPage(
+            objects,
+            self,
+            next_cursor=self.cursor(objects[-1]) if objects else None,
+            previous_cursor=self.cursor(objects[0]) if has_more else None,
+        )
+
+
+def paginate_page(request, post_list, post_per_page=10, key_field='pk'):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        paginator = KeysetPaginator(post_list, post_per_page,
+                                    key_field=key_field)
+        return paginator.page(after=after, before=before)
     paginator = Paginator(post_list, post_per_page)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.next_cursor = (encode_cursor(page_obj[-1], key_field=key_field)
+                            if page_obj.has_next() else None)
+    page_obj.cache_key = f'n{page_obj.number}'
     return page_obj
@@ -1,34 +1,81 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.cache import cache_page
+from django.utils.functional import SimpleLazyObject
 
+from . import api, fragments, search, timeline
+from .conditional import (conditional_page, group_state, post_state,
+                          profile_state)
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Follow
-from .utils import paginate_page
+from .utils import KeysetPaginator, paginate_page
+
+COMMENTS_PER_PAGE = 20
+
+
+def feed_engine(request):
+    """Jinja2 для лент из settings.JINJA2_VIEWS, иначе шаблоны Django."""
+    if request.resolver_match.url_name in settings.JINJA2_VIEWS:
+        return 'jinja2'
+    return None
+
+
+def is_streaming(request):
+    return request.resolver_match.url_name in settings.STREAMING_VIEWS
+
+
+def feed_page(request, paginate, *args):
+    """Страница ленты. При потоковой отдаче запросы за постами уходят,
+    когда шаблон до неё дойдёт, то есть уже после отправки шапки."""
+    if is_streaming(request):
+        return SimpleLazyObject(lambda: paginate(*args))
+    return paginate(*args)
+
+
+def render_feed(request, template_name, context):
+    if is_streaming(request):
+        from core.jinja import stream
+        return stream(request, template_name, context)
+    return render(request, template_name, context,
+                  using=feed_engine(request))
+
+
+def comments_page(request, post):
+    paginator = KeysetPaginator(post.comments.thread(), COMMENTS_PER_PAGE,
+                                date_field='created')
+    return paginator.page(after=request.GET.get('after'))
 
 
-@cache_page(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = paginate_page(request, post_list)
-    return render(request, 'posts/index.html', {'page_obj': page_obj})
+    post_list = Post.objects.feed()
+    page_obj = feed_page(request, paginate_page, request, post_list)
+    context = {
+        'page_obj': page_obj,
+        'generation': fragments.feed_generation(),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render_feed(request, 'posts/index.html', context)
 
 
+@conditional_page(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginate_page(request, post_list)
+    post_list = group.posts.feed()
+    page_obj = feed_page(request, paginate_page, request, post_list)
     context = {
         'group': group,
         'page_obj': page_obj
     }
-    return render(request, 'posts/group_list.html', context)
+    return render_feed(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = paginate_page(request, post_list)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    post_list = author.posts.feed()
+    page_obj = feed_page(request, paginate_page, request, post_list)
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
     context = {
@@ -36,21 +83,45 @@ def profile(request, username):
         'page_obj': page_obj,
         'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    return render_feed(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post_id_detail = get_object_or_404(Post, pk=post_id)
+    post_id_detail = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
     form = CommentForm(request.POST or None)
-    comments_list = post_id_detail.comments.all()
     context = {
         'post': post_id_detail,
         'form': form,
-        'comments': comments_list,
+        'comments': comments_page(request, post_id_detail),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев HTML-фрагментом; ``?format=json``
+    отдаёт тот же ответ, что ``api/posts/<id>/comments/``."""
+    if request.GET.get('format') == 'json':
+        return api.post_comments(request, post_id)
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search(query, after=request.GET.get('after'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -59,7 +130,8 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
         return redirect('posts:profile', username=request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -76,7 +148,8 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -94,31 +167,33 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate_page(request, post_list)
+    page_obj = feed_page(request, timeline.follow_page, request,
+                         request.user)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if request.user != author and not Follow.objects.filter(
-            user=request.user, author=author).exists():
-        Follow.objects.create(user=request.user, author=author)
+    if request.user != author:
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=author)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=author)
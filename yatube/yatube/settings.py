@@ -1,5 +1,7 @@
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # SECURITY WARNING: keep the secret key used in production secret!
@@ -30,12 +32,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.profiling.ProfilerMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -43,7 +47,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -56,8 +60,30 @@ TEMPLATES = [
             ],
         },
     },
+    # Jinja2 renders the feed pages listed in JINJA2_VIEWS (URL names, e.g.
+    # JINJA2_VIEWS=index,follow_index).
+    {
+        'NAME': 'jinja2',
+        'BACKEND': 'core.jinja.TimedJinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'core.jinja.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
 ]
 
+JINJA2_VIEWS = [name for name in os.getenv('JINJA2_VIEWS', '').split(',')
+                if name]
+# Feed pages in STREAMING_VIEWS are rendered by Jinja2 as a stream: the
+# head goes out before the posts are queried.
+STREAMING_VIEWS = [name for name
+                   in os.getenv('STREAMING_VIEWS', '').split(',') if name]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 # Database
@@ -67,9 +93,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Seconds a connection is reused across requests; 0 closes it after
+        # every request, None keeps it for the life of the thread.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '60')),
     }
 }
 
+# Applied by core.db.configure to every new SQLite connection. WAL lets
+# readers run alongside the single writer; with it synchronous=NORMAL is
+# still crash-safe. cache_size is in KiB when negative. auto_vacuum only
+# takes effect on a new database (see manage.py dbmaintain) and so has to
+# come before journal_mode, which writes the file header.
+SQLITE_PRAGMAS = {
+    'auto_vacuum': 'incremental',
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16 * 1024,
+    'temp_store': 'memory',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -108,6 +152,13 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic writes content-hashed names plus .gz/.br copies here;
+# core.views.serve_static sends them with far-future caching headers.
+STATIC_ROOT = os.getenv('STATIC_ROOT',
+                        os.path.join(BASE_DIR, 'collected_static'))
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -118,11 +169,82 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# /metrics is open to staff and to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>"; an empty token disables the latter.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Request profiler: a share of all requests, requests carrying a signed
+# X-Profile header (tokens are shown on /debug/profiles/) or staff requests
+# with ?profile=1 are traced; the newest PROFILE_KEEP profiles are kept.
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = 200
+PROFILE_TOP = 40
+PROFILE_TOKEN_MAX_AGE = 24 * 60 * 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# core.views.serve_media checks validators itself and may leave the body to
+# the front proxy: 'x-accel-redirect' (nginx, with an internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache,
+# lighttpd). Empty means Django streams the file via FileResponse.
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Post image renditions made by the task queue right after upload: each is
+# a centre crop to `size`, cut at every width up to the original's for
+# srcset; `sizes` goes to the <img> as is.
+POST_THUMBNAILS = {
+    'card': {
+        'size': (960, 339),
+        'widths': (480, 720, 960),
+        'sizes': '(min-width: 992px) 960px, 100vw',
+    },
+}
+
+# Modern formats offered in <picture> before the progressive JPEG fallback;
+# those Pillow cannot write (AVIF needs pillow-avif-plugin) are skipped.
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP')
+
+# Authors with at least this many followers are not fanned out on write;
+# their followers read the feed through the Follow join instead.
+TIMELINE_FANOUT_LIMIT = 10000
+
+# Finished background tasks are kept this many seconds, then runworker
+# deletes them; failed tasks stay until removed by hand.
+TASK_DONE_TTL = 7 * 24 * 3600
+
+# Cache backend is picked by the CACHE_BACKEND environment variable.
+# "file" keeps entries on disk and is shared by all workers on one host,
+# so it stands in for Redis locally; "redis" needs django-redis installed.
+# core.cache.single_flight locks with cache.add, so only backends where add
+# is atomic are offered ("file" takes a flock around add).
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('core.cache.LockingFileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+try:
+    CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+        os.getenv('CACHE_BACKEND', 'locmem')
+    ]
+except KeyError:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND must be one of: {}'.format(', '.join(CACHE_BACKENDS)))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_LOCATION),
     }
 }
+
+# Feed fragments are invalidated by signals (post.updated and the feed
+# generation), but a per-process cache only hears the signals of its own
+# worker, so with it the fragments also expire after this many seconds.
+FEED_CACHE_TIMEOUT = (
+    20 if CACHE_BACKEND == 'django.core.cache.backends.locmem.LocMemCache'
+    else None
+)
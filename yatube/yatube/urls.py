@@ -1,7 +1,11 @@
+import re
+
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import (metrics, profile_file, profiles, serve_media,
+                        serve_static)
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -13,9 +17,13 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics, name='metrics'),
+    path('debug/profiles/', profiles, name='profiles'),
+    path('debug/profiles/<str:filename>', profile_file, name='profile_file'),
+    re_path(r'^{}(?P<path>.+)$'.format(
+        re.escape(settings.STATIC_URL.lstrip('/'))),
+        serve_static, name='static'),
+    re_path(r'^{}(?P<path>.+)$'.format(
+        re.escape(settings.MEDIA_URL.lstrip('/'))),
+        serve_media, name='media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )